@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the terrarium variants (terrasim.py .. terrasim4.py).
+
+Every case is a seeded headless run of one variant in its own process, so
+peak RSS is per case and one slow variant cannot disturb the next. Two
+scaling curves are measured per variant:
+
+  population  --pops at the --base-cell grid       (critter count 100 -> 50k)
+  grid        --cells at the --base-pop population (algae cell 16 px -> 2 px)
+
+Each case reports ticks/s (median of --repeat runs), wall time, peak RSS and
+the mean per-phase times from the variant's --profile-out summary. The
+results are written as JSON; with --baseline the new numbers are compared
+against a saved run and any case slower than --tolerance is reported as a
+regression (exit status 1).
+
+Run:
+  python terrabench.py --out bench.json
+  python terrabench.py --variants terrasim4 --pops 1000,10000 --cells 8 --baseline bench.json
+  python terrabench.py --compare new.json --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+VARIANTS = ('terrasim', 'terrasim2', 'terrasim3', 'terrasim4')
+VERSION = 1
+_DONE = re.compile(r'(\d+) ticks \(.*\) in ([\d.]+)s: ([\d.]+) ticks/s')
+
+
+def _ints(text):
+    return [int(x) for x in text.split(',') if x]
+
+def peak_rss_mb(ru):
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(ru.ru_maxrss / (1 << 20 if sys.platform == 'darwin' else 1 << 10), 1)
+
+
+def run_case(variant, pop, cell, ticks, seed, tick_ms=50, timeout=600.0):
+    """One headless run in a child process; returns its measurements."""
+    case = {'variant': variant, 'population': pop, 'cell': cell, 'ticks': ticks, 'seed': seed}
+    cmd = [sys.executable, os.path.join(HERE, variant + '.py'), '--headless', '--seed', str(seed),
+           '--tick-ms', str(tick_ms), '--sim-seconds', str(ticks * tick_ms / 1000.0),
+           '--herbivores', str(pop), '--animal-cap', str(pop), '--cell', str(cell)]
+    env = dict(os.environ, SDL_VIDEODRIVER='dummy', PYGAME_HIDE_SUPPORT_PROMPT='1')
+    with tempfile.TemporaryDirectory() as tmp:
+        profile = os.path.join(tmp, 'profile.json')
+        cmd += ['--profile-out', profile]
+        with open(os.path.join(tmp, 'out.txt'), 'w+') as out:
+            proc = subprocess.Popen(cmd, stdout=out, stderr=subprocess.STDOUT, env=env)
+            deadline = time.monotonic() + timeout
+            # wait4 rather than wait() so the child's own rusage (peak RSS) comes back
+            while True:
+                pid, status, ru = os.wait4(proc.pid, os.WNOHANG)
+                if pid:
+                    break
+                if time.monotonic() > deadline:
+                    proc.kill()
+                    _, status, ru = os.wait4(proc.pid, 0)
+                    proc.returncode = -9
+                    case.update(status='timeout', peak_rss_mb=peak_rss_mb(ru))
+                    return case
+                time.sleep(0.05)
+            proc.returncode = os.waitstatus_to_exitcode(status)
+            out.seek(0)
+            text = out.read()
+        m = _DONE.search(text)
+        if proc.returncode != 0 or m is None:
+            case.update(status='error', error=text.strip().splitlines()[-1:] or [f"exit {proc.returncode}"])
+            return case
+        case.update(status='ok', wall_s=float(m.group(2)), ticks_per_s=float(m.group(3)),
+                    peak_rss_mb=peak_rss_mb(ru))
+        if os.path.exists(profile):
+            with open(profile) as f:
+                summary = json.load(f)
+            case['phases_ms'] = {k: v['mean_ms'] for k, v in sorted(summary['phases'].items())}
+            case['entities'] = summary.get('entities', {})
+    return case
+
+
+def run_suite(args):
+    cases = []
+    for variant in args.variants:
+        for pop in args.pops:
+            cases.append((variant, pop, args.base_cell))
+        for cell in args.cells:
+            if (variant, args.base_pop, cell) not in cases:
+                cases.append((variant, args.base_pop, cell))
+    results = []
+    for i, (variant, pop, cell) in enumerate(cases, start=1):
+        runs = [run_case(variant, pop, cell, args.ticks, args.seed, args.tick_ms, args.timeout)
+                for _ in range(args.repeat)]
+        ok = sorted((r for r in runs if r['status'] == 'ok'), key=lambda r: r['ticks_per_s'])
+        best = dict(ok[len(ok) // 2] if ok else runs[-1])
+        if ok:
+            best['ticks_per_s'] = round(statistics.median(r['ticks_per_s'] for r in ok), 2)
+            best['repeats'] = len(ok)
+        best['peak_rss_mb'] = max((r['peak_rss_mb'] for r in runs if 'peak_rss_mb' in r), default=None)
+        results.append(best)
+        print(f"[{i}/{len(cases)}] {variant:<10} pop {pop:>6}  cell {cell:>2}  " + (
+            f"{best['ticks_per_s']:>9.1f} ticks/s  {best['peak_rss_mb']:>7.1f} MB" if best['status'] == 'ok'
+            else best['status']), file=sys.stderr, flush=True)
+    return {'version': VERSION, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'machine': {'python': platform.python_version(), 'numpy': np.__version__,
+                        'platform': platform.platform(), 'cpus': os.cpu_count()},
+            'config': {k: getattr(args, k) for k in ('variants', 'pops', 'cells', 'base_pop', 'base_cell',
+                                                     'ticks', 'tick_ms', 'seed', 'repeat')},
+            'results': results}
+
+
+def compare(new, base, tolerance):
+    """Print new vs. baseline per case; return the number of regressions."""
+    key = lambda r: (r['variant'], r['population'], r['cell'])
+    old = {key(r): r for r in base['results']}
+    regressions = 0
+    print(f"{'case':<32} {'base t/s':>10} {'new t/s':>10} {'speed':>7} {'base MB':>8} {'new MB':>8}")
+    for r in new['results']:
+        b = old.get(key(r))
+        name = f"{r['variant']} pop {r['population']} cell {r['cell']}"
+        if b is None or b.get('status') != 'ok' or r.get('status') != 'ok':
+            print(f"{name:<32} {'-' if b is None else b.get('status'):>10} {r.get('status'):>10}")
+            if b is not None and b.get('status') == 'ok':
+                regressions += 1   # ran before, fails or times out now
+            continue
+        ratio = r['ticks_per_s'] / max(b['ticks_per_s'], 1e-9)
+        flag = ''
+        if ratio < 1.0 - tolerance:
+            flag, regressions = '  REGRESSION', regressions + 1
+        print(f"{name:<32} {b['ticks_per_s']:>10.1f} {r['ticks_per_s']:>10.1f} {ratio:>6.2f}x "
+              f"{b['peak_rss_mb']:>8.1f} {r['peak_rss_mb']:>8.1f}{flag}")
+    if base.get('machine') != new.get('machine'):
+        print("note: baseline was measured on a different machine / Python / numpy")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seeded headless benchmarks of the terrarium variants")
+    parser.add_argument('--variants', default=','.join(VARIANTS), help='comma list of variant scripts')
+    parser.add_argument('--pops', default='100,1000,10000,50000', help='population curve (critters)')
+    parser.add_argument('--cells', default='16,8,4,2', help='grid curve (algae cell size in px)')
+    parser.add_argument('--base-pop', type=int, default=1000, help='population for the grid curve')
+    parser.add_argument('--base-cell', type=int, default=8, help='cell size for the population curve')
+    parser.add_argument('--ticks', type=int, default=200, help='sim ticks per case')
+    parser.add_argument('--tick-ms', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=1, help='runs per case (median ticks/s is kept)')
+    parser.add_argument('--timeout', type=float, default=600.0, help='wall seconds before a case is killed')
+    parser.add_argument('--out', default=None, help='write results JSON here (default: stdout)')
+    parser.add_argument('--baseline', default=None, help='saved results JSON to compare against')
+    parser.add_argument('--compare', default=None, help='compare this saved results JSON instead of running')
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help='fractional ticks/s drop that counts as a regression')
+    args = parser.parse_args(argv)
+    args.variants = [v for v in args.variants.split(',') if v]
+    unknown = [v for v in args.variants if v not in VARIANTS]
+    if unknown:
+        parser.error(f"unknown variant(s) {', '.join(unknown)}; choose from {', '.join(VARIANTS)}")
+    args.pops, args.cells = _ints(args.pops), _ints(args.cells)
+
+    if args.compare:
+        if not args.baseline:
+            parser.error("--compare needs --baseline")
+        with open(args.compare) as f:
+            new = json.load(f)
+    else:
+        new = run_suite(args)
+        text = json.dumps(new, indent=1)
+        if args.out:
+            with open(args.out, 'w') as f:
+                f.write(text + "\n")
+        elif not args.baseline:
+            print(text)
+    if args.baseline:
+        with open(args.baseline) as f:
+            base = json.load(f)
+        return 1 if compare(new, base, args.tolerance) else 0
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
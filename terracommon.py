@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Small helpers shared by the terrarium variants (terrasim.py .. terrasim4.py).
+
+  PhaseTimer     wall-clock time per update phase and the --profile-out summary
+                 that terrabench.py reads
+  positive_int   argparse type for counts and rates that must be at least 1
+"""
+import argparse
+import json
+import time
+from collections import defaultdict, deque
+
+
+class PhaseTimer:
+    """Wall-clock time per update phase, chained as t = prof.lap('grow', t).
+    Keeps a bounded history per phase for the exit summary (mean/p95 per
+    phase, ticks/s, entity counts)."""
+    def __init__(self, history=20000):
+        self.history = defaultdict(lambda: deque(maxlen=history))
+        self.ticks = 0
+        self.start = time.perf_counter()
+
+    def lap(self, name, t0):
+        t = time.perf_counter()
+        self.history[name].append(t - t0)
+        return t
+
+    def summary(self, entities=None):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        phases = {}
+        for name, hist in self.history.items():
+            a = sorted(x * 1000.0 for x in hist)
+            phases[name] = {'mean_ms': round(sum(a) / len(a), 4), 'p95_ms': round(a[int(0.95 * (len(a) - 1))], 4),
+                            'samples': len(a)}
+        return {'ticks': self.ticks, 'wall_s': round(elapsed, 3), 'ticks_per_s': round(self.ticks / elapsed, 2),
+                'entities': entities or {}, 'phases': phases}
+
+    def dump(self, path, entities=None):
+        """Write the summary as JSON to path ('-' for stdout)."""
+        text = json.dumps(self.summary(entities), indent=2)
+        if path == '-':
+            print(text)
+        else:
+            with open(path, 'w') as f:
+                f.write(text + "\n")
+
+
+def positive_int(text):
+    """argparse type for counts and rates that must be at least 1."""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be >= 1, got {value}")
+    return value
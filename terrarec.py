@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Tick-delta recording and replay for terrarium runs (used by terrasim4.py).
+
+File layout (append-only):
+  b'TREC1\\n'  uint32 header length  JSON header
+  then chunks:  4-byte kind (b'KEYF' or b'DELT'), uint32 first tick,
+                uint32 tick count, uint32 payload length, zlib payload
+
+A KEYF chunk holds the full state at one tick. A DELT chunk holds the
+per-tick records that follow it:
+  - deaths (ids) and births (ids + positions)
+  - int16 position deltas of the survivors, torus-wrapped
+  - algae cells whose uint8 quantized value changed
+  - a few float32 HUD scalars
+
+Positions are quantized to int16 by `pos_scale` = 32767 // max(w, h), so
+arenas wider or taller than 32767 px cannot be recorded.
+Ids are kept sorted and new ids are always larger than the live ones, so
+records never need to store a permutation. Replay seeks to the nearest
+preceding keyframe and applies deltas forward; no simulation code runs.
+
+Usage:
+  python terrarec.py info run.trec
+"""
+import json
+import struct
+import sys
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+MAGIC = b'TREC1\n'
+VERSION = 1
+_CHUNK = struct.Struct('<4sIII')
+_COUNTS = struct.Struct('<IIII')   # births, deaths, survivors, changed cells
+SCALARS = ('o2', 'co2', 'nutrients', 'algae', 'critters')
+MAX_SIDE = 32767   # widest arena whose positions still fit int16 at pos_scale 1
+
+
+def quantize_algae(grid):
+    return np.rint(grid * 255.0).astype(np.uint8)
+
+
+class TickRecorder:
+    """Write per-tick state deltas with periodic keyframes and zlib-compressed chunks."""
+    def __init__(self, path, w, h, grid_shape, dt, keyframe_every=500, chunk_ticks=50, level=6):
+        if max(w, h) > MAX_SIDE:
+            raise ValueError(f"cannot record a {w}x{h} arena: positions are int16, "
+                             f"so width and height must be <= {MAX_SIDE}")
+        self.f = open(path, 'wb')
+        self.w, self.h = w, h
+        self.scale = max(1, 32767 // max(w, h))
+        self.wrap = np.array((w * self.scale, h * self.scale), dtype=np.int32)
+        self.keyframe_every = keyframe_every
+        self.chunk_ticks = chunk_ticks
+        self.level = level
+        header = {'version': VERSION, 'width': w, 'height': h, 'grid_shape': list(grid_shape), 'dt': dt,
+                  'pos_scale': self.scale, 'keyframe_every': keyframe_every, 'scalars': list(SCALARS)}
+        blob = json.dumps(header).encode()
+        self.f.write(MAGIC + struct.pack('<I', len(blob)) + blob)
+        self._pending = []
+        self._pending_first = None
+        self._since_key = None
+        self._ids = self._pos = self._alg = None
+
+    def _quantize_pos(self, pos):
+        q = np.floor(pos * self.scale).astype(np.int32)
+        return np.mod(q, self.wrap).astype(np.int16)
+
+    def _write_chunk(self, kind, first_tick, n_ticks, payload):
+        data = zlib.compress(payload, self.level)
+        self.f.write(_CHUNK.pack(kind, first_tick, n_ticks, len(data)) + data)
+
+    def _flush(self):
+        if self._pending:
+            self._write_chunk(b'DELT', self._pending_first, len(self._pending), b''.join(self._pending))
+            self._pending = []
+            self._pending_first = None
+
+    def record(self, tick, ids, pos, grid, scalars):
+        """Record one tick: ids (N,), pos (N, 2) float, algae grid, HUD scalars."""
+        order = np.argsort(ids, kind='stable')
+        ids = np.ascontiguousarray(ids[order], dtype=np.int64)
+        qpos = self._quantize_pos(pos[order])
+        alg = quantize_algae(grid)
+        sc = np.asarray(scalars, dtype=np.float32)
+        if self._since_key is None or self._since_key >= self.keyframe_every:
+            self._flush()
+            payload = (struct.pack('<I', len(ids)) + ids.tobytes() + qpos.tobytes()
+                       + alg.tobytes() + sc.tobytes())
+            self._write_chunk(b'KEYF', tick, 1, payload)
+            self._since_key = 0
+        else:
+            keep = np.isin(self._ids, ids, assume_unique=True)
+            deaths = self._ids[~keep]
+            n_surv = int(keep.sum())
+            births = ids[n_surv:]
+            if n_surv and not np.array_equal(ids[:n_surv], self._ids[keep]):
+                raise ValueError("TickRecorder: new ids must be larger than all live ids")
+            delta = qpos[:n_surv].astype(np.int32) - self._pos[keep].astype(np.int32)
+            delta = (delta + self.wrap // 2) % self.wrap - self.wrap // 2
+            changed = np.flatnonzero(alg.ravel() != self._alg.ravel()).astype(np.uint32)
+            parts = [_COUNTS.pack(len(births), len(deaths), n_surv, len(changed)),
+                     births.tobytes(), qpos[n_surv:].tobytes(), deaths.astype(np.int64).tobytes(),
+                     delta.astype(np.int16).tobytes(), changed.tobytes(), alg.ravel()[changed].tobytes(),
+                     sc.tobytes()]
+            if self._pending_first is None:
+                self._pending_first = tick
+            self._pending.append(b''.join(parts))
+            self._since_key += 1
+            if len(self._pending) >= self.chunk_ticks:
+                self._flush()
+        self._ids, self._pos, self._alg = ids, qpos, alg
+
+    def close(self):
+        self._flush()
+        self.f.close()
+
+
+class ReplayFrame:
+    __slots__ = ('tick', 'ids', 'qpos', 'algae', 'scalars', 'scale')
+
+    def __init__(self, tick, ids, qpos, algae, scalars, scale):
+        self.tick, self.ids, self.qpos, self.algae, self.scalars, self.scale = tick, ids, qpos, algae, scalars, scale
+
+    @property
+    def pos(self):
+        return self.qpos.astype(np.float32) / self.scale
+
+
+class Replay:
+    """Random-access reader for a TickRecorder file.
+
+    Decoded chunks are kept in a small LRU cache and every `mark_every`-th
+    reconstructed frame is remembered, so stepping backwards replays at most
+    that many deltas instead of restarting from the keyframe.
+    """
+    def __init__(self, path, cache_chunks=16, mark_every=32, max_marks=256):
+        self.f = open(path, 'rb')
+        if self.f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: not a terrarium recording")
+        (n,) = struct.unpack('<I', self.f.read(4))
+        self.header = json.loads(self.f.read(n))
+        if self.header.get('version') != VERSION:
+            raise ValueError(f"{path}: recording version {self.header.get('version')} (expected {VERSION})")
+        self.scale = self.header['pos_scale']
+        self.wrap = np.array((self.header['width'] * self.scale, self.header['height'] * self.scale), dtype=np.int32)
+        self.grid_shape = tuple(self.header['grid_shape'])
+        self.n_scalars = len(self.header['scalars'])
+        self.chunks = []   # (kind, first_tick, n_ticks, offset, length)
+        while True:
+            raw = self.f.read(_CHUNK.size)
+            if len(raw) < _CHUNK.size:
+                break
+            kind, first, count, length = _CHUNK.unpack(raw)
+            offset = self.f.tell()
+            self.f.seek(length, 1)
+            self.chunks.append((kind, first, count, offset, length))
+        # drop a trailing chunk cut short by an interrupted run
+        end = self.f.seek(0, 2)
+        while self.chunks and self.chunks[-1][3] + self.chunks[-1][4] > end:
+            self.chunks.pop()
+        if not self.chunks or self.chunks[0][0] != b'KEYF':
+            raise ValueError(f"{path}: recording has no keyframe")
+        self.keyframes = [i for i, c in enumerate(self.chunks) if c[0] == b'KEYF']
+        self._key_ticks = np.array([self.chunks[i][1] for i in self.keyframes])
+        self.first_tick = self.chunks[0][1]
+        last = self.chunks[-1]
+        self.last_tick = last[1] + last[2] - 1
+        self.cache_chunks = cache_chunks
+        self.mark_every, self.max_marks = mark_every, max_marks
+        self._cache = OrderedDict()
+        self._marks = OrderedDict()  # tick -> (frame, chunk index, record index)
+        self._cur = None       # (frame, chunk index, record index of the next record)
+
+    def _payload(self, ci):
+        data = self._cache.get(ci)
+        if data is None:
+            _, _, _, offset, length = self.chunks[ci]
+            self.f.seek(offset)
+            data = self._decode(ci, zlib.decompress(self.f.read(length)))
+            self._cache[ci] = data
+            if len(self._cache) > self.cache_chunks:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(ci)
+        return data
+
+    def _decode(self, ci, buf):
+        kind, first, count, _, _ = self.chunks[ci]
+        if kind == b'KEYF':
+            (n,) = struct.unpack_from('<I', buf)
+            o = 4
+            ids = np.frombuffer(buf, np.int64, n, o); o += 8 * n
+            qpos = np.frombuffer(buf, np.int16, 2 * n, o).reshape(n, 2); o += 4 * n
+            size = self.grid_shape[0] * self.grid_shape[1]
+            alg = np.frombuffer(buf, np.uint8, size, o).reshape(self.grid_shape); o += size
+            sc = np.frombuffer(buf, np.float32, self.n_scalars, o)
+            return ReplayFrame(first, ids, qpos, alg, sc, self.scale)
+        records, o = [], 0
+        for _ in range(count):
+            nb, nd, ns, nc = _COUNTS.unpack_from(buf, o); o += _COUNTS.size
+            births = np.frombuffer(buf, np.int64, nb, o); o += 8 * nb
+            bpos = np.frombuffer(buf, np.int16, 2 * nb, o).reshape(nb, 2); o += 4 * nb
+            deaths = np.frombuffer(buf, np.int64, nd, o); o += 8 * nd
+            delta = np.frombuffer(buf, np.int16, 2 * ns, o).reshape(ns, 2); o += 4 * ns
+            cidx = np.frombuffer(buf, np.uint32, nc, o); o += 4 * nc
+            cval = np.frombuffer(buf, np.uint8, nc, o); o += nc
+            sc = np.frombuffer(buf, np.float32, self.n_scalars, o); o += 4 * self.n_scalars
+            records.append((births, bpos, deaths, delta, cidx, cval, sc))
+        return records
+
+    def _apply(self, frame, rec):
+        births, bpos, deaths, delta, cidx, cval, sc = rec
+        keep = ~np.isin(frame.ids, deaths, assume_unique=True) if len(deaths) else slice(None)
+        surv = np.mod(frame.qpos[keep].astype(np.int32) + delta, self.wrap).astype(np.int16)
+        alg = frame.algae.copy()
+        alg.ravel()[cidx] = cval
+        return ReplayFrame(frame.tick + 1, np.concatenate((frame.ids[keep], births)),
+                           np.concatenate((surv, bpos)), alg, sc, self.scale)
+
+    def seek(self, tick):
+        """Reconstruct the recorded state at `tick` (clamped to the recorded range)."""
+        tick = int(min(max(tick, self.first_tick), self.last_tick))
+        k = self.keyframes[int(np.searchsorted(self._key_ticks, tick, side='right')) - 1]
+        start = (self._payload(k), k + 1, 0)
+        # resume from the cursor or a mark if one lies between that keyframe and the target
+        for cand in (self._cur, *self._marks.values()):
+            if cand is not None and start[0].tick < cand[0].tick <= tick:
+                start = cand
+        frame, ci, ri = start
+        while frame.tick < tick:
+            records = self._payload(ci)
+            if self.chunks[ci][0] == b'KEYF':
+                frame, ci, ri = records, ci + 1, 0
+                continue
+            frame = self._apply(frame, records[ri])
+            ri += 1
+            if ri >= len(records):
+                ci, ri = ci + 1, 0
+            if frame.tick % self.mark_every == 0:
+                self._marks[frame.tick] = (frame, ci, ri)
+                if len(self._marks) > self.max_marks:
+                    self._marks.popitem(last=False)
+        self._cur = (frame, ci, ri)
+        return frame
+
+    def close(self):
+        self.f.close()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2 or argv[0] != 'info':
+        print(__doc__.strip().splitlines()[-1].strip(), file=sys.stderr)
+        return 2
+    rp = Replay(argv[1])
+    size = rp.f.seek(0, 2)
+    print(json.dumps(rp.header))
+    print(f"ticks {rp.first_tick}..{rp.last_tick}  chunks {len(rp.chunks)}  keyframes {len(rp.keyframes)}  "
+          f"{size / 1e6:.2f} MB ({size / max(1, rp.last_tick - rp.first_tick + 1):.0f} B/tick)")
+    rp.close()
+
+if __name__ == '__main__':
+    sys.exit(main())
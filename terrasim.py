@@ -8,7 +8,8 @@ Features
 - Consumers: Herbivores (e.g., nematode/mites) + Predators (e.g., micro-arthropods)
 - Behaviors: random walk + biased motion to food, mating, predation, aging
 - Energetics: photosynthesis in light, organism respiration, detritus nutrient loop
-- Controls: buttons [−speed] [pause] [+speed] [spawn] [stats] [reset]
+- Controls: buttons [−speed] [pause] [+speed] [spawn] [stats] [reset] [save] [load] (F5/F9),
+  D cycles animal rendering (dots / density heatmap / auto)
 - CLI overrides for initial resources and caps
 
 Run
@@ -18,16 +19,33 @@ Run
 Notes
 - Units are normalized (0..1 for environment pools). Rates are toy but qualitatively plausible.
 - The code is organized to be easy to tweak rather than perfectly biophysical.
+
+Headless batch run (no display, stats streamed to CSV):
+  python terrasim.py --headless --sim-seconds 3600 --out stats.csv --seed 1
+
+Multi-day runs: stats every N sim seconds to a columnar store (see terratelemetry.py)
+  python terrasim.py --headless --sim-seconds 259200 --telemetry run.tlm --telemetry-every 10
 """
 import argparse
+import csv
+import itertools
+import json
 import math
 import random
 import sys
-from dataclasses import dataclass, field
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field, asdict
+from heapq import heappop, heappush
 from typing import Tuple, List
 
+import numpy as np
 import pygame
 
+from terracommon import PhaseTimer, positive_int
+from terrasplat import CritterRenderer, MODES as RENDER_MODES, splat
+from terratelemetry import TelemetrySampler
+
 Vec = pygame.math.Vector2
 
 # ------------------------------ Utilities ---------------------------------
@@ -35,6 +53,73 @@ Vec = pygame.math.Vector2
 def clamp(x, lo, hi):
     return lo if x < lo else hi if x > hi else x
 
+def torus_delta(a: Vec, b: Vec, w, h) -> Vec:
+    """Shortest vector from a to b on a w x h torus."""
+    return Vec((b.x - a.x + w / 2) % w - w / 2, (b.y - a.y + h / 2) % h - h / 2)
+
+class SpatialHash:
+    """Uniform-grid bucket index over the torus.
+
+    Buckets are at least `cell` wide, so every neighbour within `cell` of a
+    point lies in the 3x3 block of buckets around it (wrapping at the edges).
+    """
+    def __init__(self, w, h, cell):
+        self.w, self.h = w, h
+        self.cols = max(1, int(w // cell))
+        self.rows = max(1, int(h // cell))
+        self.cw = w / self.cols
+        self.ch = h / self.rows
+        self.buckets = defaultdict(list)
+        # neighbouring bucket offsets, deduplicated for grids narrower than 3
+        self._offsets = {(dc % self.cols, dr % self.rows) for dc in (-1, 0, 1) for dr in (-1, 0, 1)}
+
+    def key(self, pos: Vec):
+        return int(pos.x // self.cw) % self.cols, int(pos.y // self.ch) % self.rows
+
+    def rebuild(self, items):
+        self.buckets.clear()
+        for it in items:
+            self.buckets[self.key(it.pos)].append(it)
+
+    def remove(self, item) -> bool:
+        """Drop item (matched by identity) from its bucket; False if absent."""
+        bucket = self.buckets[self.key(item.pos)]
+        for i, it in enumerate(bucket):
+            if it is item:
+                bucket[i] = bucket[-1]
+                bucket.pop()
+                return True
+        return False
+
+    def nearby(self, pos: Vec):
+        c, r = self.key(pos)
+        for dc, dr in self._offsets:
+            yield from self.buckets.get(((c + dc) % self.cols, (r + dr) % self.rows), ())
+
+    def nearest(self, pos: Vec, radius: float):
+        """Return (item, delta) for the closest item within radius, else (None, None)."""
+        best, best_d, best_d2 = None, None, radius * radius
+        for it in self.nearby(pos):
+            d = torus_delta(pos, it.pos, self.w, self.h)
+            d2 = d.length_squared()
+            if d2 < best_d2:
+                best, best_d, best_d2 = it, d, d2
+        return best, best_d
+
+    def pair_up(self, items, radius):
+        """Greedily pair items with their nearest unpaired neighbour within radius.
+        Rebuilds the index from `items`; returns a list of (a, b, a->b delta)."""
+        self.rebuild(items)
+        pairs = []
+        for a in items:
+            if not self.remove(a):
+                continue  # already taken as someone's mate
+            b, d = self.nearest(a.pos, radius)
+            if b is not None:
+                self.remove(b)
+                pairs.append((a, b, d))
+        return pairs
+
 # ------------------------------ Environment --------------------------------
 
 @dataclass
@@ -57,55 +142,118 @@ class Environment:
 
 # ------------------------------ Algae Grid ---------------------------------
 
+# Lateral spread kernels as (dr, dc, weight); weights are normalized so the
+# kernel computes a weighted neighbour average on the torus.
+SPREAD_KERNELS = {
+    'vonneumann': [(-1, 0, 1.0), (1, 0, 1.0), (0, -1, 1.0), (0, 1, 1.0)],
+    'moore': [(dr, dc, 1.0) for dr in (-1, 0, 1) for dc in (-1, 0, 1) if (dr, dc) != (0, 0)],
+}
+
+def make_spread_kernel(name: str, aniso: float = 0.75):
+    """Return a normalized spread kernel. 'aniso' weights horizontal neighbours by
+    `aniso` and vertical ones by 1-aniso (e.g. water film running along the wall)."""
+    if name == 'aniso':
+        kern = [(0, -1, aniso), (0, 1, aniso), (-1, 0, 1.0 - aniso), (1, 0, 1.0 - aniso)]
+    else:
+        kern = SPREAD_KERNELS[name]
+    total = sum(w for _, _, w in kern)
+    return [(dr, dc, w / total) for dr, dc, w in kern if w > 0]
+
+def _wrap_slices(d, n):
+    """(dst, src) slice pairs so that dst[i] <- src[(i + d) % n]."""
+    if d == 0:
+        return [(slice(None), slice(None))]
+    if d > 0:
+        return [(slice(0, n - d), slice(d, n)), (slice(n - d, n), slice(0, d))]
+    return [(slice(-d, n), slice(0, n + d)), (slice(0, -d), slice(n + d, n))]
+
+def make_algae_lut(bg=(12, 12, 18)):
+    """256-entry RGB lookup for quantized biomass: empty cells show the
+    background, others the same (20, 30+200x, 20) green as the old tiles."""
+    x = np.arange(256) / 255.0
+    lut = np.empty((256, 3), dtype=np.uint8)
+    lut[:] = (20, 0, 20)
+    lut[:, 1] = (30 + 200 * x).astype(np.uint8)
+    lut[x <= 0.005] = bg
+    return lut
+
+ALGAE_LUT = make_algae_lut()
+
 class AlgaeGrid:
     """Simple wall biofilm represented by coarse grid storing biomass 0..1."""
-    def __init__(self, w, h, cell=10, init_level=0.2):
+    def __init__(self, w, h, cell=10, init_level=0.2, kernel=None, spread=0.05, substeps=1, rng=None):
         self.cell = cell
         self.cols = w // cell
         self.rows = h // cell
-        self.grid = [[max(0.0, min(1.0, random.gauss(init_level, 0.05)))
-                      for _ in range(self.cols)] for _ in range(self.rows)]
+        rng = rng if rng is not None else np.random.default_rng(random.getrandbits(64))
+        self.grid = np.clip(rng.normal(init_level, 0.05, (self.rows, self.cols)), 0.0, 1.0)
+        # double buffers for the diffusion stencil (front is self.grid)
+        self._back = np.empty_like(self.grid)
+        self._acc = np.empty_like(self.grid)
+        self.kernel = kernel if kernel is not None else make_spread_kernel('vonneumann')
+        self.spread = spread
+        self.substeps = max(1, substeps)
+        # raster rendering buffers (surfarray layout is cols x rows)
+        self._q_f = np.empty((self.cols, self.rows), dtype=np.float32)
+        self._rgb = np.empty((self.cols, self.rows, 3), dtype=np.uint8)
+        self._raster = pygame.Surface((self.cols, self.rows))
+        self._scaled = pygame.Surface((self.cols * cell, self.rows * cell))
+        self.dirty = True
 
     def total_biomass(self):
-        return sum(sum(row) for row in self.grid) / (self.cols * self.rows)
+        return float(self.grid.mean())
 
     def sample(self, pos: Vec):
         c = int(clamp(pos.x // self.cell, 0, self.cols - 1))
         r = int(clamp(pos.y // self.cell, 0, self.rows - 1))
-        return self.grid[r][c]
+        return float(self.grid[r, c])
+
+    def sample_many(self, pts: np.ndarray) -> np.ndarray:
+        """Vectorized sample() for an (..., 2) array of points (one gather)."""
+        c = np.clip(pts[..., 0] // self.cell, 0, self.cols - 1).astype(np.intp)
+        r = np.clip(pts[..., 1] // self.cell, 0, self.rows - 1).astype(np.intp)
+        return self.grid[r, c]
 
     def eat(self, pos: Vec, amount: float) -> float:
         c = int(clamp(pos.x // self.cell, 0, self.cols - 1))
         r = int(clamp(pos.y // self.cell, 0, self.rows - 1))
-        take = min(self.grid[r][c], amount)
-        self.grid[r][c] -= take
+        take = min(float(self.grid[r, c]), amount)
+        self.grid[r, c] -= take
+        self.dirty = True
         return take
 
+    def _diffuse(self, dt):
+        """One toroidal stencil pass: grid += spread * (nbr_avg - grid) * dt."""
+        src, acc, dst = self.grid, self._acc, self._back
+        rows, cols = src.shape
+        acc.fill(0.0)
+        for dr, dc, wgt in self.kernel:
+            for rd, rs in _wrap_slices(dr, rows):
+                for cd, cs in _wrap_slices(dc, cols):
+                    acc[rd, cd] += wgt * src[rs, cs]
+        k = self.spread * dt
+        np.multiply(src, 1.0 - k, out=dst)
+        acc *= k
+        dst += acc
+        np.clip(dst, 0.0, 1.0, out=dst)
+        self.grid, self._back = dst, src
+        self.dirty = True
+
     def grow(self, env: Environment, dt: float):
         light = env.light(0)  # peeking current light without advancing
         r_max = 0.3  # max growth rate per second at high light and nutrients
-        for r in range(self.rows):
-            for c in range(self.cols):
-                x = self.grid[r][c]
-                # Monod-like limitation by light, nutrients, water
-                lim = min(1.0, 0.2 + 0.8*light) * min(1.0, 0.3 + 0.7*env.nutrients) * min(1.0, env.water)
-                growth = r_max * lim * x * (1 - x) * dt  # logistic
-                resp = 0.02 * (1.0 - light) * x * dt     # dark respiration
-                x = x + growth - resp
-                self.grid[r][c] = clamp(x, 0.0, 1.0)
+        x = self.grid
+        # Monod-like limitation by light, nutrients, water
+        lim = min(1.0, 0.2 + 0.8*light) * min(1.0, 0.3 + 0.7*env.nutrients) * min(1.0, env.water)
+        growth = r_max * lim * x * (1 - x) * dt  # logistic
+        resp = 0.02 * (1.0 - light) * x * dt     # dark respiration
+        x += growth - resp
+        np.clip(x, 0.0, 1.0, out=x)
+        self.dirty = True
         # Lateral spread of algae (reproduction/colonization)
-        spread = 0.05
-        newgrid = [row[:] for row in self.grid]
-        for rr in range(self.rows):
-            for cc in range(self.cols):
-                nbrs = []
-                for dr, dc in [(-1,0), (1,0), (0,-1), (0,1)]:
-                    r2 = (rr + dr) % self.rows
-                    c2 = (cc + dc) % self.cols
-                    nbrs.append(self.grid[r2][c2])
-                avg = sum(nbrs) / len(nbrs)
-                newgrid[rr][cc] = clamp(self.grid[rr][cc] + spread * (avg - self.grid[rr][cc]) * dt, 0.0, 1.0)
-        self.grid = newgrid
+        sub_dt = dt / self.substeps
+        for _ in range(self.substeps):
+            self._diffuse(sub_dt)
 
         # Gas exchange: photosynthesis -> O2 up, CO2 down when light
         ps = 0.02 * light * self.total_biomass() * dt
@@ -117,15 +265,16 @@ class AlgaeGrid:
 
 
     def draw(self, surf):
-        # draw faint green tiles based on biomass
-        for r in range(self.rows):
-            for c in range(self.cols):
-                x = self.grid[r][c]
-                if x <= 0.005:
-                    continue
-                g = int(30 + 200 * x)
-                color = (20, g, 20)
-                pygame.draw.rect(surf, color, (c*self.cell, r*self.cell, self.cell, self.cell))
+        # one pixel per cell through the colour LUT, scaled up in a single blit;
+        # the raster is only rebuilt when the grid changed since the last draw
+        if self.dirty:
+            np.multiply(self.grid.T, 255.0, out=self._q_f)
+            np.rint(self._q_f, out=self._q_f)
+            np.take(ALGAE_LUT, self._q_f.astype(np.uint8), axis=0, out=self._rgb)
+            pygame.surfarray.blit_array(self._raster, self._rgb)
+            pygame.transform.scale(self._raster, self._scaled.get_size(), self._scaled)
+            self.dirty = False
+        surf.blit(self._scaled, (0, 0))
 
 # ------------------------------ Plant Pool ---------------------------------
 
@@ -152,6 +301,17 @@ class Plant:
 
 # ------------------------------ Animals ------------------------------------
 
+def forage_directions(algae: AlgaeGrid, pos: np.ndarray, sense, probes: int, rng) -> np.ndarray:
+    """Batched foraging: probe `probes` random headings at distance `sense`
+    around each of the N positions and return the (N, 2) unit vector toward the
+    highest algae biomass. `sense` may be a scalar or an (N,) array."""
+    ang = rng.uniform(0.0, 2*math.pi, (len(pos), probes))
+    d = np.stack((np.cos(ang), np.sin(ang)), axis=-1)           # (N, K, 2)
+    sense = np.asarray(sense, dtype=float)[..., None, None]
+    vals = algae.sample_many(pos[:, None, :] + d * sense)        # (N, K)
+    best = vals.argmax(axis=1)
+    return d[np.arange(len(pos)), best]
+
 @dataclass
 class Animal:
     pos: Vec
@@ -164,6 +324,7 @@ class Animal:
     size: int = 2
     kind: str = "herbivore"   # or "predator"
     repro_threshold: float = 1.2
+    slot: int = -1   # index in its Simulation list, -1 once removed
 
     def alive(self):
         return self.energy > 0 and self.age < self.max_age
@@ -174,10 +335,13 @@ class Animal:
         # occasional random reorientation “twitch”
         if random.random() < 0.05:
             v.rotate_ip(random.uniform(-45, 45))
+        if bias is not None:
+            v = v + bias * 0.3
         if v.length() == 0:
             v = Vec(1, 0)
         v = v.normalize() * self.speed
         self.pos += v * dt
+        self.age += dt
         
         # torus wrap (no bouncing)
         if self.pos.x < 0: self.pos.x += w
@@ -196,18 +360,6 @@ class Herbivore(Animal):
     speed: float = 35.0
     size: int = 2
 
-    def forage_bias(self, algae: AlgaeGrid) -> Vec:
-        # sample a few directions, move toward higher algae
-        best_dir = Vec(0, 0); best = -1
-        for _ in range(5):
-            ang = random.uniform(0, 2*math.pi)
-            d = Vec(math.cos(ang), math.sin(ang))
-            probe = self.pos + d * self.sense
-            val = algae.sample(probe)
-            if val > best:
-                best, best_dir = val, d
-        return best_dir
-
     def eat(self, algae: AlgaeGrid, dt: float):
         take = algae.eat(self.pos, 0.2 * dt)
         self.energy += 2.0 * take
@@ -218,27 +370,22 @@ class Predator(Animal):
     speed: float = 45.0
     size: int = 3
 
-    def hunt_bias(self, prey: List[Herbivore]) -> Tuple[Vec, Herbivore]:
-        target = None
-        best_d2 = self.sense**2
-        for h in prey:
-            d2 = (h.pos - self.pos).length_squared()
-            if d2 < best_d2:
-                best_d2 = d2
-                target = h
+    def hunt_bias(self, prey_index: SpatialHash) -> Tuple[Vec, Herbivore]:
+        target, d = prey_index.nearest(self.pos, self.sense)
         if target is None:
             return Vec(0, 0), None
-        dir = (target.pos - self.pos)
-        if dir.length() > 0:
-            dir = dir.normalize()
-        return dir, target
-
-    def try_eat(self, target: Herbivore) -> bool:
-        if (target.pos - self.pos).length() < (self.size + target.size + 2):
+        if d.length() > 0:
+            d = d.normalize()
+        return d, target
+
+    def try_eat(self, prey_index: SpatialHash) -> Herbivore:
+        """Kill and eat the nearest herbivore in reach; returns it, or None."""
+        target, _ = prey_index.nearest(self.pos, self.size + Herbivore.size + 2)
+        if target is not None:
             self.energy += 0.6
             target.energy = -1  # kill
-            return True
-        return False
+            prey_index.remove(target)
+        return target
 
 # ------------------------------ UI Widgets ---------------------------------
 
@@ -262,22 +409,100 @@ class Button:
         txt = font.render(self.label, True, (230, 230, 230))
         surf.blit(txt, txt.get_rect(center=self.rect.center))
 
-class PlantPatch:
-    def __init__(self, pos: Vec, biomass: float = 0.3):
-        self.pos = pos
-        self.biomass = biomass  # 0..1
-
-    def update(self, env: Environment, dt: float):
+class PlantPatches:
+    """Moss patches stored as parallel arrays (position, biomass) updated in batch.
+
+    Only the first `n` rows are live; capacity doubles on demand. Each tick all
+    patches grow together and their nutrient/gas exchange is applied to the
+    environment once as a summed flux.
+    """
+    def __init__(self, capacity=16):
+        self.n = 0
+        self.pos = np.zeros((capacity, 2))
+        self.biomass = np.zeros(capacity)  # 0..1
+
+    def __len__(self):
+        return self.n
+
+    def add(self, pos, biomass):
+        """Append k patches given (k, 2) positions and (k,) biomass."""
+        k = len(pos)
+        cap = len(self.biomass)
+        if self.n + k > cap:
+            while cap < self.n + k:
+                cap *= 2
+            for name in ('pos', 'biomass'):
+                old = getattr(self, name)
+                new = np.zeros((cap,) + old.shape[1:])
+                new[:self.n] = old[:self.n]
+                setattr(self, name, new)
+        self.pos[self.n:self.n + k] = pos
+        self.biomass[self.n:self.n + k] = biomass
+        self.n += k
+
+    def update(self, env: Environment, dt: float, cap: int, w, h, rng):
+        n = self.n
+        if n == 0:
+            return
         light = env.light(0)
+        b = self.biomass[:n]
         # logistic growth + light & nutrient limitation
-        growth = 0.12 * light * env.nutrients * self.biomass * (1 - self.biomass) * dt
-        resp = 0.01 * (1.0 - light) * self.biomass * dt
-        self.biomass = clamp(self.biomass + growth - resp, 0.0, 1.0)
-        # nutrient uptake and gas exchange
-        env.nutrients = clamp(env.nutrients - 0.02 * light * dt * max(0.2, self.biomass), 0.0, 1.0)
-        env.o2 = clamp(env.o2 + 0.010 * light * self.biomass * dt - 0.004 * (1.0 - light) * dt, 0.05, 0.35)
-        env.co2 = clamp(env.co2 - 0.008 * light * self.biomass * dt + 0.003 * (1.0 - light) * dt, 0.0002, 0.01)
+        growth = 0.12 * light * env.nutrients * b * (1 - b) * dt
+        resp = 0.01 * (1.0 - light) * b * dt
+        np.clip(b + growth - resp, 0.0, 1.0, out=b)
+        # nutrient uptake and gas exchange, summed over patches
+        total = float(b.sum())
+        env.nutrients = clamp(env.nutrients - 0.02 * light * dt * float(np.maximum(b, 0.2).sum()), 0.0, 1.0)
+        env.o2 = clamp(env.o2 + 0.010 * light * total * dt - 0.004 * (1.0 - light) * dt * n, 0.05, 0.35)
+        env.co2 = clamp(env.co2 - 0.008 * light * total * dt + 0.003 * (1.0 - light) * dt * n, 0.0002, 0.01)
+        # reproduction: large patches spawn a nearby patch
+        parents = np.flatnonzero((b > 0.6) & (rng.random(n) < 0.02 * dt))[:max(0, cap - n)]
+        # senescence: tiny patches recycle to nutrients and disappear
+        keep = b > 0.02
+        if len(parents):
+            b[parents] *= 0.85
+            offset = rng.uniform(-30, 30, (len(parents), 2))
+            child_pos = (self.pos[parents] + offset) % (w, h)
+        m = int(keep.sum())
+        if m < n:
+            env.nutrients = clamp(env.nutrients + 0.05 * (n - m), 0.0, 1.0)
+            self.pos[:m] = self.pos[:n][keep]
+            self.biomass[:m] = b[keep]
+            self.n = m
+        if len(parents):
+            self.add(child_pos, np.full(len(parents), 0.2))
 
+    def draw(self, surf):
+        # one batched splat per radius: outer disc, then the darker ring inside it
+        n = self.n
+        rad = np.maximum(2, (8 * np.sqrt(self.biomass[:n])).astype(int))
+        pos = self.pos[:n]
+        for r in np.unique(rad).tolist():
+            at = pos[rad == r]
+            inner = max(1, r // 2)
+            splat(surf, at, (40, 130, 40), r)
+            splat(surf, at, (30, 90, 30), inner)
+            if inner > 2:
+                splat(surf, at, (40, 130, 40), inner - 2)
+
+
+# ------------------------------ Snapshots ----------------------------------
+
+SNAPSHOT_VERSION = 1
+_ANIMAL_SCALARS = ('energy', 'age', 'max_age', 'speed', 'sense', 'size', 'repro_threshold')
+
+def _pack_animals(prefix, animals):
+    arrs = {prefix + 'pos': np.array([(a.pos.x, a.pos.y) for a in animals], dtype=float).reshape(-1, 2),
+            prefix + 'vel': np.array([(a.vel.x, a.vel.y) for a in animals], dtype=float).reshape(-1, 2)}
+    for f in _ANIMAL_SCALARS:
+        arrs[prefix + f] = np.array([getattr(a, f) for a in animals], dtype=float)
+    return arrs
+
+def _unpack_animals(cls, prefix, z):
+    cols = {f: z[prefix + f].tolist() for f in _ANIMAL_SCALARS}
+    return [cls(pos=Vec(*p), vel=Vec(*v), size=int(cols['size'][i]),
+                **{f: cols[f][i] for f in _ANIMAL_SCALARS if f != 'size'})
+            for i, (p, v) in enumerate(zip(z[prefix + 'pos'].tolist(), z[prefix + 'vel'].tolist()))]
 
 # ------------------------------ Simulation ---------------------------------
 
@@ -286,29 +511,120 @@ class Simulation:
         self.w, self.h = args.width, args.height
         self.env = Environment(water=args.water, o2=args.o2, co2=args.co2, light_phase=0.0,
                                day_length_s=args.day_length)
-        self.algae = AlgaeGrid(self.w, self.h, cell=8, init_level=args.algae_init)
-        self.plants: List[PlantPatch] = []
-        for _ in range(args.plants):
-            self.plants.append(
-                PlantPatch(
-                    pos=Vec(random.uniform(0, self.w), random.uniform(0, self.h)),
-                    biomass=0.25 + random.random() * 0.2
-                )
-            )
+        self.rng = np.random.default_rng(random.getrandbits(64))
+        self.algae = AlgaeGrid(self.w, self.h, cell=args.cell, init_level=args.algae_init, rng=self.rng,
+                               kernel=make_spread_kernel(args.spread_kernel, args.spread_aniso),
+                               spread=args.spread, substeps=args.spread_substeps)
+        self.plants = PlantPatches(max(16, args.plants))
+        self.plants.add(self.rng.uniform((0, 0), (self.w, self.h), (args.plants, 2)),
+                        0.25 + self.rng.random(args.plants) * 0.2)
 
         self.plant = Plant(biomass=args.plant_init)
         self.herbivores: List[Herbivore] = []
         self.predators: List[Predator] = []
+        # herbivore buckets sized to predator sensing range, rebuilt every tick
+        self.prey_index = SpatialHash(self.w, self.h, Predator.sense)
+        self.mate_index = SpatialHash(self.w, self.h, 12)
+        self.renderer = CritterRenderer(self.w, self.h, args.render, args.density_above)
+        self.sim_time = 0.0
+        # age-out events: (sim_time when max_age is reached, tie-break, animal)
+        self.expiry = []
+        self._seq = itertools.count()
         self.spawn_initial(args)
         self.time_scale = 1.0
         self.running = True
         self.paused = False
         self.args = args
+        self.telemetry = None
+        self.prof = PhaseTimer()
+
+    def start_telemetry(self, path, every=1.0):
+        """Append stats() to the columnar store at `path` every `every` sim seconds."""
+        self.telemetry = TelemetrySampler(path, every, meta={'sim': 'terrasim', 'dt': self.args.tick_ms / 1000.0})
+
+    def close(self):
+        if self.telemetry is not None:
+            self.telemetry.close()
+            self.telemetry = None
+
+    def save_snapshot(self, path):
+        """Write the full sim state (environment, algae, plants, animals and both
+        RNG states) to a versioned, uncompressed .npz file."""
+        rs_version, rs_words, rs_gauss = random.getstate()
+        meta = {'version': SNAPSHOT_VERSION, 'size': [self.w, self.h], 'sim_time': self.sim_time,
+                'env': asdict(self.env), 'plant': self.plant.biomass,
+                'random': [rs_version, rs_gauss], 'np_rng': self.rng.bit_generator.state}
+        arrays = {'meta': np.array(json.dumps(meta)),
+                  'random_words': np.array(rs_words, dtype=np.uint32),
+                  'algae': self.algae.grid,
+                  'plant_pos': self.plants.pos[:self.plants.n],
+                  'plant_biomass': self.plants.biomass[:self.plants.n]}
+        arrays.update(_pack_animals('herb_', self.herbivores))
+        arrays.update(_pack_animals('pred_', self.predators))
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    def load_snapshot(self, path):
+        """Replace this simulation's state with a snapshot written by save_snapshot."""
+        with np.load(path) as z:
+            meta = json.loads(str(z['meta']))
+            if meta.get('version') != SNAPSHOT_VERSION:
+                raise ValueError(f"{path}: snapshot version {meta.get('version')} (expected {SNAPSHOT_VERSION})")
+            if z['algae'].shape != self.algae.grid.shape:
+                raise ValueError(f"{path}: algae grid {z['algae'].shape} does not match {self.algae.grid.shape}; "
+                                 f"snapshot was taken at {meta['size'][0]}x{meta['size'][1]}")
+            self.env = Environment(**meta['env'])
+            self.sim_time = meta['sim_time']
+            self.plant.biomass = meta['plant']
+            self.algae.grid[...] = z['algae']
+            self.algae.dirty = True
+            self.plants = PlantPatches(max(16, len(z['plant_biomass'])))
+            self.plants.add(z['plant_pos'], z['plant_biomass'])
+            self.herbivores, self.predators, self.expiry = [], [], []
+            for a in _unpack_animals(Herbivore, 'herb_', z) + _unpack_animals(Predator, 'pred_', z):
+                self._add(a)
+            rs_version, rs_gauss = meta['random']
+            random.setstate((rs_version, tuple(z['random_words'].tolist()), rs_gauss))
+            self.rng.bit_generator.state = meta['np_rng']
 
 
     def spawn_initial(self, args):
         for _ in range(args.herbivores):
-            self.herbivores.append(self._mk_herbivore())
+            self._add(self._mk_herbivore())
+        for _ in range(args.predators):
+            self._add(self._mk_predator())
+
+    def _add(self, a):
+        """Append an animal to its species list and queue its age-out event."""
+        animals = self.herbivores if a.kind == "herbivore" else self.predators
+        a.slot = len(animals)
+        animals.append(a)
+        heappush(self.expiry, (self.sim_time + a.max_age - a.age, next(self._seq), a))
+
+    def _aged_out(self):
+        """Pop the animals whose age-out event is due."""
+        due, now = [], self.sim_time + 1e-9
+        while self.expiry and self.expiry[0][0] <= now:
+            a = heappop(self.expiry)[2]
+            if a.slot >= 0:   # else it already died of something else
+                due.append(a)
+        return due
+
+    def _remove(self, dead):
+        """Swap-remove animals: the last of each list fills the hole, so this is
+        O(len(dead)) and list order is not kept. Returns the number removed."""
+        removed = 0
+        for a in dead:
+            if a.slot < 0:
+                continue
+            animals = self.herbivores if a.kind == "herbivore" else self.predators
+            last = animals.pop()
+            if last is not a:
+                animals[a.slot] = last
+                last.slot = a.slot
+            a.slot = -1
+            removed += 1
+        return removed
 
     def _mk_herbivore(self):
         return Herbivore(pos=Vec(random.uniform(0, self.w), random.uniform(0, self.h)),
@@ -323,44 +639,55 @@ class Simulation:
     def update(self, dt):
         if self.paused:
             return
-        dt *= self.time_scale
+        prof = self.prof
+        t = time.perf_counter()
+        self.sim_time += dt
         light = self.env.light(dt)
         # Primary producers
         self.algae.grow(self.env, dt)
         # Plants grow, reproduce, and die
-        for p in self.plants[:]:
-            p.update(self.env, dt)
-            # reproduction: spawn a nearby patch if large enough
-            if p.biomass > 0.6 and len(self.plants) < self.args.plant_cap and random.random() < 0.02 * dt:
-                offset = Vec(random.uniform(-30, 30), random.uniform(-30, 30))
-                new_pos = Vec((p.pos.x + offset.x) % self.w, (p.pos.y + offset.y) % self.h)
-                self.plants.append(PlantPatch(pos=new_pos, biomass=0.2))
-                p.biomass *= 0.85
-            # senescence: tiny patches recycle to nutrients and disappear
-            if p.biomass <= 0.02:
-                self.env.nutrients = clamp(self.env.nutrients + 0.05, 0.0, 1.0)
-                self.plants.remove(p)
-        
+        self.plants.update(self.env, dt, self.args.plant_cap, self.w, self.h, self.rng)
         self.plant.update(self.env, dt)
+        t = prof.lap('grow', t)
         # Animal behaviors
-        # Herbivores forage
-        for h in self.herbivores:
-            bias = h.forage_bias(self.algae)
-            h.step(dt, self.w, self.h, bias)
-            # eat algae underfoot
-            h.eat(self.algae, dt)
-            # respiration: consume O2
-            self.env.o2 = clamp(self.env.o2 - 0.0001 * dt, 0.05, 0.35)
-            self.env.co2 = clamp(self.env.co2 + 0.00008 * dt, 0.0002, 0.01)
-        # Clean up dead / old; recycle to nutrients
-        before_h = len(self.herbivores)
-        before_p = len(self.predators)
-        self.herbivores = [h for h in self.herbivores if h.alive()]
-        self.predators = [p for p in self.predators if p.alive()]
-        death_count = (before_h - len(self.herbivores)) + (before_p - len(self.predators))
+        # Herbivores forage (all probes sampled in one batch)
+        dead = []
+        if self.herbivores:
+            pos = np.array([(h.pos.x, h.pos.y) for h in self.herbivores])
+            sense = np.array([h.sense for h in self.herbivores])
+            biases = forage_directions(self.algae, pos, sense, self.args.forage_probes, self.rng)
+            for h, bias in zip(self.herbivores, biases):
+                h.step(dt, self.w, self.h, Vec(*bias))
+                # eat algae underfoot
+                h.eat(self.algae, dt)
+                if h.energy <= 0:
+                    dead.append(h)
+                # respiration: consume O2
+                self.env.o2 = clamp(self.env.o2 - 0.0001 * dt, 0.05, 0.35)
+                self.env.co2 = clamp(self.env.co2 + 0.00008 * dt, 0.0002, 0.01)
+        t = prof.lap('herbivores', t)
+        # Predators hunt the nearest herbivore found through the spatial index
+        if self.predators:
+            self.prey_index.rebuild(self.herbivores)
+            for p in self.predators:
+                bias, _ = p.hunt_bias(self.prey_index)
+                p.step(dt, self.w, self.h, bias)
+                prey = p.try_eat(self.prey_index)
+                if prey is not None:
+                    dead.append(prey)
+                if p.energy <= 0:
+                    dead.append(p)
+                self.env.o2 = clamp(self.env.o2 - 0.0001 * dt, 0.05, 0.35)
+                self.env.co2 = clamp(self.env.co2 + 0.00008 * dt, 0.0002, 0.01)
+        t = prof.lap('predators', t)
+        # Clean up dead (collected above) / old (due age-out events); recycle to nutrients
+        death_count = self._remove(dead + self._aged_out())
         self.env.nutrients = clamp(self.env.nutrients + 0.01 * death_count, 0.0, 1.0)
+        t = prof.lap('cull', t)
         # Reproduction (simple: need nearby mate + energy threshold + cap)
         self._reproduce()
+        prof.lap('reproduce', t)
+        prof.ticks += 1
         # Leakages in sealed bottle (very small to keep dynamics stable)
         self.env.water = clamp(self.env.water - 0.00001 * dt + 0.000005 * dt, 0.2, 1.0)
         # If producers are completely absent, nutrients slowly drift toward zero
@@ -370,21 +697,43 @@ class Simulation:
 
         # Temperature slight daily wave
         self.env.temp_c = 21.0 + 1.5 * math.sin(2*math.pi*self.env.light_phase)
+        if self.telemetry is not None:
+            self.telemetry.offer(self.sim_time, self.stats)
 
     def _reproduce(self):
-        # Herbivores
-        if len(self.herbivores) < self.args.animal_cap:
-            random.shuffle(self.herbivores)
-            for i in range(0, len(self.herbivores)-1, 2):
-                a, b = self.herbivores[i], self.herbivores[i+1]
-                if a.can_reproduce() and b.can_reproduce() and (a.pos - b.pos).length() < 12:
-                    child = self._mk_herbivore()
-                    child.pos = (a.pos + b.pos) / 2
-                    child.energy = 0.7
-                    a.energy *= 0.65; b.energy *= 0.65
-                    self.herbivores.append(child)
-                    if len(self.herbivores) >= self.args.animal_cap:
-                        break
+        # Herbivores: eligible animals pair with their nearest eligible neighbour
+        room = self.args.animal_cap - len(self.herbivores)
+        if room > 0:
+            eligible = [h for h in self.herbivores if h.can_reproduce()]
+            random.shuffle(eligible)
+            children = []
+            for a, b, d in self.mate_index.pair_up(eligible, 12)[:room]:
+                child = self._mk_herbivore()
+                mid = a.pos + d / 2
+                child.pos = Vec(mid.x % self.w, mid.y % self.h)
+                child.energy = 0.7
+                a.energy *= 0.65; b.energy *= 0.65
+                children.append(child)
+            for child in children:
+                self._add(child)
+
+    def stats(self):
+        """Environment and population scalars for one time-series row."""
+        return {'light': round(self.env.light(0), 4), 'o2': round(self.env.o2, 5), 'co2': round(self.env.co2, 6),
+                'nutrients': round(self.env.nutrients, 5), 'water': round(self.env.water, 5),
+                'temp_c': round(self.env.temp_c, 3), 'plant': round(self.plant.biomass, 5),
+                'algae': round(self.algae.total_biomass(), 5), 'plant_patches': len(self.plants),
+                'herbivores': len(self.herbivores), 'predators': len(self.predators)}
+
+    def render_groups(self):
+        """(positions, colour, radius) groups for CritterRenderer, split by species and size."""
+        groups = []
+        for animals, color in ((self.herbivores, (180, 220, 120)), (self.predators, (220, 120, 120))):
+            by_size = defaultdict(list)
+            for a in animals:
+                by_size[a.size].append((a.pos.x, a.pos.y))
+            groups += [(np.array(pts), color, size) for size, pts in by_size.items()]
+        return groups
 
     def draw(self, surf, font):
         surf.fill((12, 12, 18))
@@ -393,18 +742,14 @@ class Simulation:
         # plant
         #self.plant.draw(surf, (self.w//2, self.h//2), radius_max=min(self.w, self.h)//4)
         # draw plants
-        for p in self.plants:
-            rad = max(2, int(8 * math.sqrt(p.biomass)))
-            pygame.draw.circle(surf, (40, 130, 40), (int(p.pos.x), int(p.pos.y)), rad)
-            pygame.draw.circle(surf, (30, 90, 30), (int(p.pos.x), int(p.pos.y)), max(1, rad // 2), width=2)
-        # animals
-        for h in self.herbivores:
-            pygame.draw.circle(surf, (180, 220, 120), (int(h.pos.x), int(h.pos.y)), h.size)
-        for p in self.predators:
-            pygame.draw.circle(surf, (220, 120, 120), (int(p.pos.x), int(p.pos.y)), p.size)
+        self.plants.draw(surf)
+        # animals: one batched splat (or density heatmap) per species and size
+        mode = self.renderer.draw(surf, self.render_groups())
         # HUD
         light = self.env.light(0)
         hud = f"Light {light:0.2f}  O2 {self.env.o2:0.3f}  CO2 {self.env.co2:0.4f}  Nutr {self.env.nutrients:0.2f}  Water {self.env.water:0.2f}  Plant {self.plant.biomass:0.2f}  Algae {self.algae.total_biomass():0.2f}  H {len(self.herbivores)}  x{self.time_scale:0.1f}"
+        if mode == 'density':
+            hud += "  [density]"
         # hud = f"O2 {self.env.o2:0.3f}  CO2 {self.env.co2:0.4f}  Nutr {self.env.nutrients:0.2f}  Water {self.env.water:0.2f}  Plants {len(self.plants)}  Critters {len(self.critters)}  x{self.time_scale:0.1f}"
 
         text = font.render(hud, True, (230, 230, 230))
@@ -412,6 +757,81 @@ class Simulation:
 
 # ------------------------------ Main / App ---------------------------------
 
+MAX_SPEED = 1000.0  # sim seconds per wall second; beyond what the CPU can do the scheduler saturates
+
+class Scheduler:
+    """Fixed-step sim clock decoupled from the render rate.
+
+    Each frame adds wall time x sim.time_scale to an accumulator that is drained
+    in fixed sim_dt substeps until it is empty or the part of the frame not
+    needed for drawing is used up. Backlog that does not fit is dropped, so a
+    high speed setting runs at full CPU throughput without enlarging dt.
+    """
+    def __init__(self, sim_dt, fps):
+        self.sim_dt = sim_dt
+        self.frame_s = 1.0 / fps
+        self.acc = 0.0
+        self.render_s = 0.0   # smoothed draw+flip time
+        self.substeps = 0     # substeps run in the last frame
+        self.last = self._sim_end = time.perf_counter()
+
+    def advance(self, sim):
+        now = time.perf_counter()
+        wall = min(now - self.last, 0.25)
+        self.last = now
+        self.substeps = 0
+        if sim.paused:
+            self.acc = 0.0
+        else:
+            self.acc += wall * sim.time_scale
+            deadline = now + max(self.frame_s - self.render_s, 0.25 * self.frame_s)
+            while self.acc >= self.sim_dt:
+                sim.update(self.sim_dt)
+                self.acc -= self.sim_dt
+                self.substeps += 1
+                if time.perf_counter() >= deadline:
+                    self.acc = min(self.acc, self.sim_dt)
+                    break
+        self._sim_end = time.perf_counter()
+
+    def rendered(self):
+        self.render_s = 0.8 * self.render_s + 0.2 * (time.perf_counter() - self._sim_end)
+
+def run_headless(args):
+    """Fixed-step batch run without a display: step the simulation as fast as the
+    CPU allows, stream stats rows to --out (CSV) and report ticks/second."""
+    sim = Simulation(args)
+    if args.restore:
+        sim.load_snapshot(args.restore)
+    if args.telemetry:
+        sim.start_telemetry(args.telemetry, args.telemetry_every)
+    dt = args.tick_ms / 1000.0
+    ticks = int(round(args.sim_seconds / dt))
+    every = max(1, int(round(args.stats_every / dt)))
+    out = open(args.out, 'w', newline='') if args.out else None
+    writer = None
+    start = time.perf_counter()
+    try:
+        for tick in range(1, ticks + 1):
+            sim.update(dt)
+            if out is not None and tick % every == 0:
+                row = {'t': round(sim.sim_time, 6), **sim.stats()}
+                if writer is None:
+                    writer = csv.DictWriter(out, fieldnames=list(row))
+                    writer.writeheader()
+                writer.writerow(row)
+    finally:
+        if out is not None:
+            out.close()
+        sim.close()
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"{ticks} ticks ({ticks * dt:.0f} sim-s) in {elapsed:.2f}s: {ticks / elapsed:.1f} ticks/s")
+    if args.profile_out:
+        sim.prof.dump(args.profile_out, {'herbivores': len(sim.herbivores), 'predators': len(sim.predators)})
+    if args.snapshot:
+        sim.save_snapshot(args.snapshot)
+    return sim
+
 def main(argv=None):
     parser = argparse.ArgumentParser(description="Sealed terrarium simulation (Pygame)")
     parser.add_argument('--width', type=int, default=900)
@@ -423,19 +843,49 @@ def main(argv=None):
     parser.add_argument('--o2', type=float, default=0.21)
     parser.add_argument('--co2', type=float, default=0.0006)
     parser.add_argument('--algae-init', type=float, default=0.20)
+    parser.add_argument('--cell', type=int, default=8, help='algae grid cell size in pixels')
     parser.add_argument('--plant-init', type=float, default=0.30)
+    # Algae lateral spread
+    parser.add_argument('--spread', type=float, default=0.05, help='Algae lateral spread rate per second')
+    parser.add_argument('--spread-kernel', choices=['vonneumann', 'moore', 'aniso'], default='vonneumann')
+    parser.add_argument('--spread-aniso', type=float, default=0.75,
+                        help="Horizontal share of spread for the 'aniso' kernel (0.5 = isotropic)")
+    parser.add_argument('--spread-substeps', type=int, default=1, help='Diffusion substeps per tick')
     # Animals
     parser.add_argument('--herbivores', type=int, default=25)
+    parser.add_argument('--predators', type=int, default=0)
     parser.add_argument('--animal-cap', type=int, default=100)
+    parser.add_argument('--forage-probes', type=positive_int, default=5, help='Random headings probed per herbivore per tick')
     # RNG
     parser.add_argument('--seed', type=int, default=None)
+    # Snapshots
+    parser.add_argument('--restore', default=None, help='start from a snapshot (.npz) instead of a fresh terrarium')
+    parser.add_argument('--snapshot', default=None,
+                        help='snapshot file for F5 save / F9 load (default terrarium.npz); headless runs save here at the end')
     parser.add_argument('--plants', type=int, default=3)
     parser.add_argument('--plant-cap', type=int, default=20)
 
 
+    parser.add_argument('--render', choices=RENDER_MODES, default='auto',
+                        help="animal drawing: dots, density heatmap, or auto (D key cycles)")
+    parser.add_argument('--density-above', type=int, default=3000,
+                        help='animal count above which auto mode switches to the density heatmap')
+    parser.add_argument('--fps', type=positive_int, default=30, help='display frame rate cap; sim steps are sub-stepped per frame')
+    parser.add_argument('--headless', action='store_true', help='run without a display as fast as possible')
+    parser.add_argument('--sim-seconds', type=float, default=600.0, help='headless run length in sim seconds')
+    parser.add_argument('--stats-every', type=float, default=1.0, help='sim seconds between headless stats rows')
+    parser.add_argument('--out', default=None, help='CSV file for the headless stats time series')
+    parser.add_argument('--profile-out', default=None,
+                        help="write per-phase timing summary JSON here after a headless run ('-' = stdout)")
+    parser.add_argument('--telemetry', default=None,
+                        help='append environment and population stats to this columnar store (see terratelemetry.py)')
+    parser.add_argument('--telemetry-every', type=float, default=1.0, help='sim seconds between telemetry rows')
     args = parser.parse_args(argv)
     if args.seed is not None:
         random.seed(args.seed)
+    if args.headless:
+        run_headless(args)
+        return
 
     pygame.init()
     pygame.display.set_caption("Terrarium in a Bottle – sealed ecosystem sim")
@@ -444,6 +894,22 @@ def main(argv=None):
     font = pygame.font.SysFont('consolas', 16)
 
     sim = Simulation(args)
+    if args.restore:
+        sim.load_snapshot(args.restore)
+    if args.telemetry:
+        sim.start_telemetry(args.telemetry, args.telemetry_every)
+    snapshot_path = args.snapshot or 'terrarium.npz'
+
+    def save_snapshot():
+        sim.save_snapshot(snapshot_path)
+        print(f"saved snapshot t={sim.sim_time:.1f}s -> {snapshot_path}")
+
+    def load_snapshot():
+        try:
+            sim.load_snapshot(snapshot_path)
+            print(f"restored snapshot t={sim.sim_time:.1f}s <- {snapshot_path}")
+        except (OSError, ValueError) as e:
+            print(f"cannot restore snapshot: {e}", file=sys.stderr)
 
     # UI buttons
     btns = []
@@ -452,21 +918,28 @@ def main(argv=None):
         btns.append(Button((x, y, bw, bh), label, action))
     add_btn(args.width - (bw+margin)*5, args.height - (bh+margin), '− speed', lambda: setattr(sim, 'time_scale', max(0.1, sim.time_scale/1.5)))
     add_btn(args.width - (bw+margin)*4, args.height - (bh+margin), 'pause/res', lambda: setattr(sim, 'paused', not sim.paused))
-    add_btn(args.width - (bw+margin)*3, args.height - (bh+margin), '+ speed', lambda: setattr(sim, 'time_scale', min(50.0, sim.time_scale*1.5)))
-    add_btn(args.width - (bw+margin)*2, args.height - (bh+margin), 'spawn', lambda: [sim.herbivores.append(sim._mk_herbivore()) if len(sim.herbivores)<args.animal_cap else None])
+    add_btn(args.width - (bw+margin)*3, args.height - (bh+margin), '+ speed', lambda: setattr(sim, 'time_scale', min(MAX_SPEED, sim.time_scale*1.5)))
+    add_btn(args.width - (bw+margin)*2, args.height - (bh+margin), 'spawn', lambda: [sim._add(sim._mk_herbivore()) if len(sim.herbivores)<args.animal_cap else None])
     def stats_action():
-        # small pulse of printout; could be extended to CSV logging
-        print(f"t={pygame.time.get_ticks()/1000:.1f}s light={sim.env.light(0):.2f} O2={sim.env.o2:.3f} CO2={sim.env.co2:.4f} nutr={sim.env.nutrients:.2f} plant={sim.plant.biomass:.2f} algae={sim.algae.total_biomass():.2f} H={len(sim.herbivores)} P={len(sim.predators)}")
+        # small pulse of printout; --telemetry keeps the full time series
+        print(f"t={pygame.time.get_ticks()/1000:.1f}s light={sim.env.light(0):.2f} O2={sim.env.o2:.3f} CO2={sim.env.co2:.4f} nutr={sim.env.nutrients:.2f} plant={sim.plant.biomass:.2f} algae={sim.algae.total_biomass():.2f} H={len(sim.herbivores)} P={len(sim.predators)}"
+              + (f" telemetry={sim.telemetry.rows} rows -> {args.telemetry}" if sim.telemetry is not None else ""))
     add_btn(args.width - (bw+margin)*1, args.height - (bh+margin), 'stats', stats_action)
 
     # Reset button on the left corner
     def do_reset():
         nonlocal sim
-        sim = Simulation(args)
+        # a fresh terrarium keeps appending to the same telemetry store
+        new = Simulation(args)
+        new.telemetry, sim.telemetry = sim.telemetry, None
+        sim = new
     btn_reset = Button((margin, args.height - (bh+margin), 90, bh), 'reset', do_reset)
+    btns.append(Button((margin + 96, args.height - (bh+margin), 90, bh), 'save', save_snapshot))
+    btns.append(Button((margin + 192, args.height - (bh+margin), 90, bh), 'load', load_snapshot))
 
     running = True
     base_tick = args.tick_ms
+    sched = Scheduler(base_tick / 1000.0, args.fps)
 
     while running:
         # Events
@@ -477,18 +950,24 @@ def main(argv=None):
                 if ev.key == pygame.K_ESCAPE:
                     running = False
                 elif ev.key in (pygame.K_PLUS, pygame.K_EQUALS):
-                    sim.time_scale = min(50.0, sim.time_scale * 1.5)
+                    sim.time_scale = min(MAX_SPEED, sim.time_scale * 1.5)
                 elif ev.key in (pygame.K_MINUS, pygame.K_UNDERSCORE):
                     sim.time_scale = max(0.1, sim.time_scale / 1.5)
                 elif ev.key == pygame.K_SPACE:
                     sim.paused = not sim.paused
+                elif ev.key == pygame.K_F5:
+                    save_snapshot()
+                elif ev.key == pygame.K_F9:
+                    load_snapshot()
+                elif ev.key == pygame.K_d:
+                    sim.renderer.cycle()
+                    args.render = sim.renderer.mode
             btn_reset.handle(ev)
             for b in btns:
                 b.handle(ev)
 
-        # Update
-        dt = base_tick / 1000.0
-        sim.update(dt)
+        # Update: as many fixed-size sim steps as this frame's budget allows
+        sched.advance(sim)
 
         # Draw
         sim.draw(screen, font)
@@ -496,10 +975,12 @@ def main(argv=None):
         for b in btns:
             b.draw(screen, font)
         pygame.display.flip()
+        sched.rendered()
 
-        clock.tick(1000 // base_tick)
+        clock.tick(args.fps)
 
     pygame.quit()
+    sim.close()
 
 if __name__ == '__main__':
     main()
@@ -16,16 +16,25 @@ Enhancements:
 
 Run:
   python terrarium_sim_pygame.py --width 900 --height 700 --herbivores 80 --animal-cap 500
+
+Headless batch run (no display, stats streamed to CSV):
+  python terrasim3.py --headless --sim-seconds 3600 --out stats.csv --seed 1
 """
 import argparse
+import csv
+import itertools
 import math
 import random
+import time
 from dataclasses import dataclass, field
+from heapq import heappop, heappush
 from typing import Tuple, List, Deque
 from collections import deque
 
 import pygame
 
+from terracommon import PhaseTimer, positive_int
+
 Vec = pygame.math.Vector2
 
 def clamp(x, lo, hi):
@@ -136,6 +145,7 @@ class Critter:
     size: int = 2
     repro_threshold: float = 1.1
     trail: List[Vec] = field(default_factory=list)
+    slot: int = -1   # index in Simulation.critters, -1 once removed
 
     def alive(self):
         return self.energy > 0 and self.age < self.max_age
@@ -209,18 +219,53 @@ class Simulation:
     def __init__(self, args):
         self.w, self.h = args.width, args.height
         self.env = Environment()
-        self.algae = AlgaeGrid(self.w, self.h, cell=8, init_level=args.algae_init)
+        self.algae = AlgaeGrid(self.w, self.h, cell=args.cell, init_level=args.algae_init)
         self.plant = Plant(biomass=0.3)
         self.critters: List[Critter] = []
+        # age-out events: (clock when max_age is reached, tie-break, critter)
+        self.clock = 0.0
+        self.expiry = []
+        self._seq = itertools.count()
         for _ in range(args.herbivores):
-            self.critters.append(self._mk_critter())
+            self._add(self._mk_critter())
         self.time_scale = 1.0
         self.paused = False
         self.args = args
+        self.prof = PhaseTimer()
         # population history buffering for small plot panel
         self.pop_history = deque(maxlen=self.args.pop_hist)
         self.pop_sample_accum = 0.0
 
+    def _add(self, c):
+        """Append a critter and queue its age-out event for the clock time it reaches max_age."""
+        c.slot = len(self.critters)
+        self.critters.append(c)
+        heappush(self.expiry, (self.clock + c.max_age - c.age, next(self._seq), c))
+
+    def _aged_out(self):
+        """Pop the critters whose age-out event is due."""
+        due, now = [], self.clock + 1e-9
+        while self.expiry and self.expiry[0][0] <= now:
+            c = heappop(self.expiry)[2]
+            if c.slot >= 0:   # else it already died of something else
+                due.append(c)
+        return due
+
+    def _remove(self, dead):
+        """Swap-remove critters: the last one fills each hole, so this is
+        O(len(dead)) and list order is not kept. Returns the number removed."""
+        crit, removed = self.critters, 0
+        for c in dead:
+            if c.slot < 0:
+                continue
+            last = crit.pop()
+            if last is not c:
+                crit[c.slot] = last
+                last.slot = c.slot
+            c.slot = -1
+            removed += 1
+        return removed
+
     def _mk_critter(self):
         return Critter(pos=Vec(random.uniform(0, self.w), random.uniform(0, self.h)),
                        vel=Vec(random.uniform(-1,1), random.uniform(-1,1)), energy=1.0,
@@ -229,20 +274,29 @@ class Simulation:
     def update(self, dt):
         if self.paused:
             return
-        dt *= self.time_scale
+        prof = self.prof
+        t = time.perf_counter()
+        self.clock += dt
         self.algae.grow(self.env, dt)
         self.plant.update(self.env, dt)
+        t = prof.lap('grow', t)
+        starved = []
         for c in self.critters:
             bias = c.forage_bias(self.algae)
             c.step(dt, self.w, self.h, bias)
             c.eat(self.algae, dt)
+            if c.energy <= 0:
+                starved.append(c)
             self.env.o2 = clamp(self.env.o2 - 0.0001 * dt, 0.0, 0.35)
             self.env.co2 = clamp(self.env.co2 + 0.00008 * dt, 0.0, 0.01)
-        before = len(self.critters)
-        self.critters = [c for c in self.critters if c.alive()]
-        deaths = before - len(self.critters)
+        t = prof.lap('critters', t)
+        # deaths come from starvation seen in the loop above and due age-out events
+        deaths = self._remove(starved + self._aged_out())
         self.env.nutrients = clamp(self.env.nutrients + 0.01 * deaths, 0.0, 1.0)
+        t = prof.lap('cull', t)
         self._reproduce()
+        prof.lap('reproduce', t)
+        prof.ticks += 1
         # sample population for plot
         self.pop_sample_accum += dt
         if self.pop_sample_accum >= self.args.pop_sample_every:
@@ -257,18 +311,27 @@ class Simulation:
 
     def _reproduce(self):
         if self.algae.total_biomass() > 0.06 and len(self.critters) < self.args.animal_cap:
-            random.shuffle(self.critters)
-            for i in range(0, len(self.critters)-1, 2):
-                a, b = self.critters[i], self.critters[i+1]
+            # shuffle a copy: list positions are the critters' slots
+            order = self.critters[:]
+            random.shuffle(order)
+            for i in range(0, len(order)-1, 2):
+                a, b = order[i], order[i+1]
                 if a.can_reproduce() and b.can_reproduce() and (a.pos - b.pos).length() < (self.w / len(self.critters)) * 10:
                     child = self._mk_critter()
                     child.pos = (a.pos + b.pos) / 2
                     child.energy = 0.7
                     a.energy *= 0.65; b.energy *= 0.65
-                    self.critters.append(child)
+                    self._add(child)
                     if len(self.critters) >= self.args.animal_cap:
                         break
 
+    def stats(self):
+        """Environment and population scalars for one time-series row."""
+        return {'light': round(self.env.light(0), 4), 'o2': round(self.env.o2, 5), 'co2': round(self.env.co2, 6),
+                'nutrients': round(self.env.nutrients, 5), 'water': round(self.env.water, 5),
+                'temp_c': round(self.env.temp_c, 3), 'plant': round(self.plant.biomass, 5),
+                'algae': round(self.algae.total_biomass(), 5), 'critters': len(self.critters)}
+
     def draw(self, surf, font):
         surf.fill((12, 12, 18))
         self.algae.draw(surf)
@@ -306,19 +369,101 @@ class Simulation:
             panel.blit(lbl, (8, 6))
         surf.blit(panel, (px, py))
 
+MAX_SPEED = 1000.0  # sim seconds per wall second; beyond what the CPU can do the scheduler saturates
+
+class Scheduler:
+    """Fixed-step sim clock decoupled from the render rate.
+
+    Each frame adds wall time x sim.time_scale to an accumulator that is drained
+    in fixed sim_dt substeps until it is empty or the part of the frame not
+    needed for drawing is used up. Backlog that does not fit is dropped, so a
+    high speed setting runs at full CPU throughput without enlarging dt.
+    """
+    def __init__(self, sim_dt, fps):
+        self.sim_dt = sim_dt
+        self.frame_s = 1.0 / fps
+        self.acc = 0.0
+        self.render_s = 0.0   # smoothed draw+flip time
+        self.substeps = 0     # substeps run in the last frame
+        self.last = self._sim_end = time.perf_counter()
+
+    def advance(self, sim):
+        now = time.perf_counter()
+        wall = min(now - self.last, 0.25)
+        self.last = now
+        self.substeps = 0
+        if sim.paused:
+            self.acc = 0.0
+        else:
+            self.acc += wall * sim.time_scale
+            deadline = now + max(self.frame_s - self.render_s, 0.25 * self.frame_s)
+            while self.acc >= self.sim_dt:
+                sim.update(self.sim_dt)
+                self.acc -= self.sim_dt
+                self.substeps += 1
+                if time.perf_counter() >= deadline:
+                    self.acc = min(self.acc, self.sim_dt)
+                    break
+        self._sim_end = time.perf_counter()
+
+    def rendered(self):
+        self.render_s = 0.8 * self.render_s + 0.2 * (time.perf_counter() - self._sim_end)
+
+def run_headless(args):
+    """Fixed-step batch run without a display: step the simulation as fast as the
+    CPU allows, stream stats rows to --out (CSV) and report ticks/second."""
+    sim = Simulation(args)
+    dt = args.tick_ms / 1000.0
+    ticks = int(round(args.sim_seconds / dt))
+    every = max(1, int(round(args.stats_every / dt)))
+    out = open(args.out, 'w', newline='') if args.out else None
+    writer = None
+    start = time.perf_counter()
+    try:
+        for tick in range(1, ticks + 1):
+            sim.update(dt)
+            if out is not None and tick % every == 0:
+                row = {'t': round(tick * dt, 6), **sim.stats()}
+                if writer is None:
+                    writer = csv.DictWriter(out, fieldnames=list(row))
+                    writer.writeheader()
+                writer.writerow(row)
+    finally:
+        if out is not None:
+            out.close()
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"{ticks} ticks ({ticks * dt:.0f} sim-s) in {elapsed:.2f}s: {ticks / elapsed:.1f} ticks/s")
+    if args.profile_out:
+        sim.prof.dump(args.profile_out, {'critters': len(sim.critters)})
+    return sim
+
 def main(argv=None):
     parser = argparse.ArgumentParser()
     parser.add_argument('--width', type=int, default=900)
     parser.add_argument('--height', type=int, default=700)
     parser.add_argument('--tick-ms', type=int, default=50)
     parser.add_argument('--algae-init', type=float, default=0.20)
+    parser.add_argument('--cell', type=int, default=8, help='algae grid cell size in pixels')
     parser.add_argument('--herbivores', type=int, default=80)
     parser.add_argument('--animal-cap', type=int, default=500)
     parser.add_argument('--pop-hist', type=int, default=600, help='samples kept for population plot')
     parser.add_argument('--pop-sample-every', type=float, default=0.5, help='sim seconds between pop samples')
     parser.add_argument('--pop-panel-w', type=int, default=240)
     parser.add_argument('--pop-panel-h', type=int, default=120)
+    parser.add_argument('--fps', type=positive_int, default=30, help='display frame rate cap; sim steps are sub-stepped per frame')
+    parser.add_argument('--headless', action='store_true', help='run without a display as fast as possible')
+    parser.add_argument('--sim-seconds', type=float, default=600.0, help='headless run length in sim seconds')
+    parser.add_argument('--stats-every', type=float, default=1.0, help='sim seconds between headless stats rows')
+    parser.add_argument('--out', default=None, help='CSV file for the headless stats time series')
+    parser.add_argument('--profile-out', default=None,
+                        help="write per-phase timing summary JSON here after a headless run ('-' = stdout)")
+    parser.add_argument('--seed', type=int, default=None)
     args = parser.parse_args(argv)
+    if args.seed is not None:
+        random.seed(args.seed)
+    if args.headless:
+        run_headless(args)
+        return
 
     pygame.init()
     screen = pygame.display.set_mode((args.width, args.height))
@@ -335,10 +480,11 @@ def main(argv=None):
     # place at bottom-right
     add_btn(args.width - (bw+margin)*3, args.height - (bh+margin), '− speed', lambda: setattr(sim, 'time_scale', max(0.1, sim.time_scale/1.5)))
     add_btn(args.width - (bw+margin)*2, args.height - (bh+margin), 'pause/res', lambda: setattr(sim, 'paused', not sim.paused))
-    add_btn(args.width - (bw+margin)*1, args.height - (bh+margin), '+ speed', lambda: setattr(sim, 'time_scale', min(50.0, sim.time_scale*1.5)))
+    add_btn(args.width - (bw+margin)*1, args.height - (bh+margin), '+ speed', lambda: setattr(sim, 'time_scale', min(MAX_SPEED, sim.time_scale*1.5)))
 
     running = True
     base_tick = args.tick_ms
+    sched = Scheduler(base_tick / 1000.0, args.fps)
     while running:
         for ev in pygame.event.get():
             # handle buttons (mouse move/click)
@@ -350,19 +496,19 @@ def main(argv=None):
                 if ev.key == pygame.K_ESCAPE:
                     running = False
                 elif ev.key in (pygame.K_PLUS, pygame.K_EQUALS):
-                    sim.time_scale = min(50.0, sim.time_scale * 1.5)
+                    sim.time_scale = min(MAX_SPEED, sim.time_scale * 1.5)
                 elif ev.key in (pygame.K_MINUS, pygame.K_UNDERSCORE):
                     sim.time_scale = max(0.1, sim.time_scale / 1.5)
                 elif ev.key == pygame.K_SPACE:
                     sim.paused = not sim.paused
-        dt = base_tick / 1000.0
-        sim.update(dt)
+        sched.advance(sim)
         sim.draw(screen, font)
         # draw buttons
         for b in btns:
             b.draw(screen, font)
         pygame.display.flip()
-        clock.tick(1000 // base_tick)
+        sched.rendered()
+        clock.tick(args.fps)
     pygame.quit()
 
 if __name__ == '__main__':
@@ -10,22 +10,52 @@ Terrarium-in-a-bottle: a minimal sealed-ecosystem simulation with Pygame.
 
 Enhancements:
 - Environment space is a torus (wrap-around edges).
-- Critters (herbivore-like) with vanishing trails.
+- Critters (herbivore-like) with vanishing trails, stored as parallel NumPy arrays.
 - Algae and Plant biomass that grow and reproduce.
 - Nutrients decay to zero if no producers exist.
 
 Run:
   python terrarium_sim_pygame.py --width 900 --height 700 --herbivores 80 --animal-cap 500
+
+Headless batch run (no display, stats streamed to CSV):
+  python terrasim4.py --headless --sim-seconds 3600 --out stats.csv --seed 1
+
+Movie of a run without a window (needs ffmpeg; or use frames/run.png):
+  python terrasim4.py --video run.mp4 --sim-seconds 600 --video-every 4
+
+Keys: +/- speed, space pause, S spawn, R reset, D render mode, P profiler.
+--threaded moves the simulation to a background thread (see SimThread).
+
+Record a run and scrub through it afterwards (see terrarec.py):
+  python terrasim4.py --headless --sim-seconds 3600 --record run.trec
+  python terrasim4.py --replay run.trec
+
+Long runs can log stats to a memory-mappable columnar store:
+  python terrasim4.py --headless --sim-seconds 86400 --telemetry run.tlm --telemetry-every 5
+  python terratelemetry.py plot run.tlm --cols o2,co2,algae,critters
 """
 import argparse
+import csv
+import dataclasses
 import math
+import queue
+import os
 import random
+import subprocess
+import threading
+import time
 from dataclasses import dataclass, field
-from typing import Tuple, List, Deque
-from collections import deque
+from heapq import heapify, heappop, heappush
+from collections import deque, defaultdict
 
+import numpy as np
 import pygame
 
+from terracommon import PhaseTimer, positive_int
+from terrarec import MAX_SIDE as RECORD_MAX_SIDE, TickRecorder, Replay
+from terratelemetry import TelemetrySampler
+from terrasplat import CritterRenderer, MODES as RENDER_MODES
+
 Vec = pygame.math.Vector2
 
 def clamp(x, lo, hi):
@@ -47,58 +77,137 @@ class Environment:
         raw = math.sin(ang)
         return max(0.0, raw)
 
+def make_algae_lut(bg=(12, 12, 18)):
+    """256-entry RGB lookup for quantized biomass: empty cells show the
+    background, others the same (20, 30+200x, 20) green as the old tiles."""
+    x = np.arange(256) / 255.0
+    lut = np.empty((256, 3), dtype=np.uint8)
+    lut[:] = (20, 0, 20)
+    lut[:, 1] = (30 + 200 * x).astype(np.uint8)
+    lut[x <= 0.005] = bg
+    return lut
+
+ALGAE_LUT = make_algae_lut()
+
 class AlgaeGrid:
-    def __init__(self, w, h, cell=10, init_level=0.2):
+    """Wall biofilm: float32 biomass array (rows x cols), values 0..1.
+
+    The grid total is kept as a running aggregate: eat()/eat_many() subtract
+    what they take and grow() refreshes it in its single whole-array pass, so
+    total_biomass() is O(1). With debug=True every update is cross-checked
+    against a full recompute.
+    """
+    def __init__(self, w, h, cell=10, init_level=0.2, rng=None, debug=False):
         self.cell = cell
         self.cols = w // cell
         self.rows = h // cell
-        self.grid = [[max(0.0, min(1.0, random.gauss(init_level, 0.05)))
-                      for _ in range(self.cols)] for _ in range(self.rows)]
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.grid = self.rng.normal(init_level, 0.05, (self.rows, self.cols)).astype(np.float32)
+        np.clip(self.grid, 0.0, 1.0, out=self.grid)
+        self._tmp = np.empty_like(self.grid)  # scratch buffer reused by grow()
+        self.debug = debug
+        self._sum = float(self.grid.sum(dtype=np.float64))
+        # raster rendering buffers (surfarray layout is cols x rows)
+        self._q_f = np.empty((self.cols, self.rows), dtype=np.float32)
+        self._rgb = np.empty((self.cols, self.rows, 3), dtype=np.uint8)
+        self._raster = pygame.Surface((self.cols, self.rows))
+        self._scaled = pygame.Surface((self.cols * cell, self.rows * cell))
+        self.dirty = True
 
     def total_biomass(self):
-        return sum(sum(row) for row in self.grid) / (self.cols * self.rows)
+        return self._sum / self.grid.size
+
+    def _check_sum(self, where):
+        full = float(self.grid.sum(dtype=np.float64))
+        if abs(full - self._sum) > 1e-4 * max(1.0, full):
+            raise AssertionError(f"AlgaeGrid aggregate drift after {where}: running {self._sum:.6f} vs full {full:.6f}")
+
+    def _index(self, pos: Vec):
+        return int(pos.y // self.cell) % self.rows, int(pos.x // self.cell) % self.cols
 
     def sample(self, pos: Vec):
-        c = int(pos.x // self.cell) % self.cols
-        r = int(pos.y // self.cell) % self.rows
-        return self.grid[r][c]
+        return float(self.grid[self._index(pos)])
 
     def eat(self, pos: Vec, amount: float) -> float:
-        c = int(pos.x // self.cell) % self.cols
-        r = int(pos.y // self.cell) % self.rows
-        take = min(self.grid[r][c], amount)
-        self.grid[r][c] -= take
+        rc = self._index(pos)
+        take = min(float(self.grid[rc]), amount)
+        self.grid[rc] -= take
+        self._sum -= take
+        self.dirty = True
+        if self.debug:
+            self._check_sum('eat')
         return take
 
+    def sample_many(self, pts: np.ndarray) -> np.ndarray:
+        """Vectorized sample() for an (..., 2) array of points (one gather)."""
+        r = (pts[..., 1] // self.cell).astype(np.intp) % self.rows
+        c = (pts[..., 0] // self.cell).astype(np.intp) % self.cols
+        return self.grid[r, c]
+
+    def eat_many(self, pos: np.ndarray, amount: float) -> np.ndarray:
+        """Vectorized eat() for an (N, 2) position array. Critters sharing a cell
+        split what is available there evenly; returns the amount each one took."""
+        r = (pos[:, 1] // self.cell).astype(np.intp) % self.rows
+        c = (pos[:, 0] // self.cell).astype(np.intp) % self.cols
+        flat_idx = r * self.cols + c
+        flat = self.grid.reshape(-1)
+        demand = np.bincount(flat_idx, minlength=flat.size) * amount
+        hit = np.flatnonzero(demand)
+        taken = np.minimum(flat[hit], demand[hit])
+        flat[hit] -= taken
+        self._sum -= float(taken.sum())
+        self.dirty = True
+        if self.debug:
+            self._check_sum('eat_many')
+        frac = np.zeros(flat.size)
+        frac[hit] = taken / demand[hit]
+        return amount * frac[flat_idx]
+
     def grow(self, env: Environment, dt: float):
         light = env.light(0)
         r_max = 0.45
+        x, tmp = self.grid, self._tmp
         total_before = self.total_biomass()
-        for r in range(self.rows):
-            for c in range(self.cols):
-                x = self.grid[r][c]
-                lim = min(1.0, 0.2 + 0.8*light) * min(1.0, 0.3 + 0.7*env.nutrients) * min(1.0, env.water)
-                growth = r_max * lim * x * (1 - x) * dt
-                resp = 0.02 * (1.0 - light) * x * dt
-                x = x + growth - resp
-                self.grid[r][c] = clamp(x, 0.0, 1.0)
-                if random.random() < 0.0005 * dt:
-                    self.grid[r][c] = clamp(self.grid[r][c] + 0.2, 0.0, 1.0)
-        ps = 0.02 * light * self.total_biomass() * dt
+        lim = min(1.0, 0.2 + 0.8*light) * min(1.0, 0.3 + 0.7*env.nutrients) * min(1.0, env.water)
+        # logistic growth minus dark respiration, in place:
+        #   x += r_max*lim*dt * x*(1-x) - 0.02*(1-light)*dt * x
+        np.subtract(1.0, x, out=tmp)
+        tmp *= r_max * lim * dt
+        tmp += 1.0 - 0.02 * (1.0 - light) * dt
+        x *= tmp
+        np.clip(x, 0.0, 1.0, out=x)
+        self._sum = float(x.sum(dtype=np.float64))  # the one full reduction per tick
+        self.dirty = True
+        # Bernoulli reseeding: each cell independently with p = 0.0005*dt.
+        # Drawing the hit count first avoids a full-grid random field per tick.
+        p = min(1.0, 0.0005 * dt)
+        hits = self.rng.binomial(x.size, p)
+        if hits:
+            flat = x.reshape(-1)
+            idx = np.unique(self.rng.integers(0, x.size, hits))
+            old = flat[idx]
+            flat[idx] = np.minimum(old + 0.2, 1.0)
+            self._sum += float((flat[idx] - old).sum(dtype=np.float64))
+        if self.debug:
+            self._check_sum('grow')
+        total_after = self.total_biomass()
+        ps = 0.02 * light * total_after * dt
         env.o2 = clamp(env.o2 + ps - 0.01 * (1.0 - light) * dt, 0.0, 0.35)
         env.co2 = clamp(env.co2 - 0.8 * ps + 0.005 * (1.0 - light) * dt, 0.0, 0.01)
-        net = self.total_biomass() - total_before
+        net = total_after - total_before
         env.nutrients = clamp(env.nutrients - max(0.0, net)*0.05 - 0.001*dt, 0.0, 1.0)
 
     def draw(self, surf):
-        for r in range(self.rows):
-            for c in range(self.cols):
-                x = self.grid[r][c]
-                if x <= 0.005:
-                    continue
-                g = int(30 + 200 * x)
-                color = (20, g, 20)
-                pygame.draw.rect(surf, color, (c*self.cell, r*self.cell, self.cell, self.cell))
+        # one pixel per cell through the colour LUT, scaled up in a single blit;
+        # the raster is only rebuilt when the grid changed since the last draw
+        if self.dirty:
+            np.multiply(self.grid.T, 255.0, out=self._q_f)
+            np.rint(self._q_f, out=self._q_f)
+            np.take(ALGAE_LUT, self._q_f.astype(np.uint8), axis=0, out=self._rgb)
+            pygame.surfarray.blit_array(self._raster, self._rgb)
+            pygame.transform.scale(self._raster, self._scaled.get_size(), self._scaled)
+            self.dirty = False
+        surf.blit(self._scaled, (0, 0))
 
 @dataclass
 class Plant:
@@ -124,68 +233,364 @@ class Plant:
         pygame.draw.circle(surf, (40, 130, 40), center, r)
         pygame.draw.circle(surf, (30, 90, 30), center, int(0.7*r), width=2)
 
-@dataclass
-class Critter:
-    pos: Vec
-    vel: Vec
-    energy: float
-    age: float = 0.0
-    max_age: float = 1500.0
-    speed: float = 35.0
-    sense: float = 40.0
-    size: int = 2
-    repro_threshold: float = 1.1
-    trail: List[Vec] = field(default_factory=list)
-
-    def alive(self):
-        return self.energy > 0 and self.age < self.max_age
-
-    def step(self, dt, w, h, bias: Vec = None):
-        jitter = Vec(random.uniform(-1, 1), random.uniform(-1, 1)) * 0.5
-        v = self.vel * 0.1 + jitter * 0.9
+def forage_directions(algae: AlgaeGrid, pos: np.ndarray, sense, probes: int, rng) -> np.ndarray:
+    """Probe `probes` random headings at distance `sense` around each of the N
+    positions and return the (N, 2) unit vector toward the richest algae."""
+    ang = rng.uniform(0.0, 2*math.pi, (len(pos), probes))
+    d = np.stack((np.cos(ang), np.sin(ang)), axis=-1)           # (N, K, 2)
+    vals = algae.sample_many(pos[:, None, :] + d * sense)        # (N, K)
+    best = vals.argmax(axis=1)
+    return d[np.arange(len(pos)), best]
+
+CRITTER_COLOR = (180, 220, 120)
+_trail_sprites = {}
+
+def trail_sprite(alpha: int):
+    """Cached 4x4 trail dot at the given alpha (rendered once per alpha level)."""
+    sprite = _trail_sprites.get(alpha)
+    if sprite is None:
+        sprite = pygame.Surface((4, 4), pygame.SRCALPHA)
+        pygame.draw.circle(sprite, CRITTER_COLOR + (alpha,), (2, 2), 2)
+        _trail_sprites[alpha] = sprite
+    return sprite
+
+class Population:
+    """Critters stored as parallel NumPy arrays (structure of arrays).
+
+    Only the first `n` rows of each array are live; capacity doubles on demand.
+    Species constants (speed, sense, size, repro_threshold) are shared.
+    Trails live in a fixed-capacity ring buffer shared by all critters: every
+    step writes slot `trail_head`, so a critter's j-th most recent point is in
+    slot (trail_head - j) % trail_cap.
+    Each critter gets a unique, increasing id at birth (used by recordings).
+
+    Deaths are O(deaths), not O(population): `row` maps id -> live row,
+    `expiry` is a min-heap of (clock at which max_age is reached, id), so
+    cull() pops only the critters that age out this tick, and remove() fills
+    each hole with one of the last live rows. Row order is therefore not
+    birth order. Heap entries of critters that died otherwise go stale and
+    are skipped when they come up.
+    """
+    speed = 35.0
+    sense = 40.0
+    size = 2
+    repro_threshold = 1.1
+
+    def __init__(self, capacity=256, trail_cap=30):
+        self.n = 0
+        self.steps = 0
+        self.next_id = 0
+        self.clock = 0.0      # sum of step dt; ages advance with it
+        self.row = {}
+        self.expiry = []
+        self.trail_cap = trail_cap
+        self.trail_head = 0
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.pos = np.zeros((capacity, 2))
+        self.vel = np.zeros((capacity, 2))
+        self.energy = np.zeros(capacity)
+        self.age = np.zeros(capacity)
+        self.max_age = np.zeros(capacity)
+        self.trail = np.zeros((capacity, trail_cap, 2), dtype=np.float32)
+        self.trail_n = np.zeros(capacity, dtype=np.intp)
+        self.trail_keep = self.trail_cap
+
+    _fields = ('ids', 'pos', 'vel', 'energy', 'age', 'max_age', 'trail', 'trail_n')
+
+    def __len__(self):
+        return self.n
+
+    def _reserve(self, need):
+        cap = len(self.energy)
+        if need <= cap:
+            return
+        while cap < need:
+            cap *= 2
+        for name in self._fields:
+            old = getattr(self, name)
+            new = np.zeros((cap,) + old.shape[1:], dtype=old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, name, new)
+
+    def add(self, pos, vel, energy, max_age, age=0.0):
+        """Append k critters given (k, 2) pos/vel and (k,) energy/max_age (and age) arrays."""
+        k = len(pos)
+        self._reserve(self.n + k)
+        sl = slice(self.n, self.n + k)
+        self.ids[sl] = np.arange(self.next_id, self.next_id + k)
+        self.next_id += k
+        self.pos[sl] = pos
+        self.vel[sl] = vel
+        self.energy[sl] = energy
+        self.age[sl] = age
+        self.max_age[sl] = max_age
+        self.trail_n[sl] = 0
+        self._track(self.n, self.n + k)
+        self.n += k
+
+    def _track(self, start, stop):
+        """Index rows start:stop by id and queue their age-out events."""
+        ids = self.ids[start:stop].tolist()
+        self.row.update(zip(ids, range(start, stop)))
+        due = (self.clock + self.max_age[start:stop] - self.age[start:stop]).tolist()
+        if stop - start > len(self.expiry) // 4:
+            self.expiry.extend(zip(due, ids))
+            heapify(self.expiry)
+        else:
+            for item in zip(due, ids):
+                heappush(self.expiry, item)
+
+    def step(self, dt, w, h, bias, rng):
+        n = self.n
+        pos, vel = self.pos[:n], self.vel[:n]
+        jitter = rng.uniform(-1.0, 1.0, (n, 2)) * 0.5
+        v = vel * 0.1 + jitter * 0.9
         if bias is not None:
-            v = v + bias * 0.3
-        if v.length() == 0:
-            v = Vec(1, 0)
-        v = v.normalize() * self.speed
-        self.pos = Vec((self.pos.x + v.x * dt) % w, (self.pos.y + v.y * dt) % h)
-        self.vel = v
-        self.energy -= 0.02 * dt
-        self.age += dt
-        # update trail
-        self.trail.append(self.pos)
-        thresh = max(30/(dt*20),5)
-        if len(self.trail) > thresh:
-            self.trail.pop(0)
-
-    def can_reproduce(self):
-        return self.energy >= self.repro_threshold
-
-    def forage_bias(self, algae: AlgaeGrid) -> Vec:
-        best_dir = Vec(0, 0); best = -1
-        for _ in range(5):
-            ang = random.uniform(0, 2*math.pi)
-            d = Vec(math.cos(ang), math.sin(ang))
-            probe = self.pos + d * self.sense
-            val = algae.sample(probe)
-            if val > best:
-                best, best_dir = val, d
-        return best_dir
-
-    def eat(self, algae: AlgaeGrid, dt: float):
-        take = algae.eat(self.pos, 0.2 * dt)
-        self.energy += 2.0 * take
+            v += bias * 0.3
+        length = np.hypot(v[:, 0], v[:, 1])
+        still = length == 0
+        v[still] = (1.0, 0.0)
+        length[still] = 1.0
+        v *= (self.speed / length)[:, None]
+        pos += v * dt
+        np.mod(pos, (w, h), out=pos)
+        vel[:] = v
+        self.energy[:n] -= 0.02 * dt
+        self.age[:n] += dt
+        self.clock += dt
+        # update trail ring buffer
+        self.trail[:n, self.trail_head] = pos
+        self.trail_head = (self.trail_head + 1) % self.trail_cap
+        np.minimum(self.trail_n[:n] + 1, self.trail_cap, out=self.trail_n[:n])
+        self.trail_keep = int(min(self.trail_cap, max(self.trail_cap/(dt*20), 5)))
+        self.steps += 1
+
+    def cull(self) -> int:
+        """Drop starved critters and those whose age-out event is due; return the number removed."""
+        dead = np.flatnonzero(self.energy[:self.n] <= 0)
+        expiry, row, now = self.expiry, self.row, self.clock + 1e-9
+        if expiry and expiry[0][0] <= now:
+            aged = []
+            while expiry and expiry[0][0] <= now:
+                r = row.get(heappop(expiry)[1])
+                if r is not None:
+                    aged.append(r)
+            if aged:
+                dead = np.union1d(dead, aged)
+        return self.remove(dead)
+
+    def remove(self, rows) -> int:
+        """Drop the given (unique) live rows by moving the last live rows into
+        the holes; O(len(rows)). Returns the number removed."""
+        d = len(rows)
+        if not d:
+            return 0
+        rows = np.asarray(rows, dtype=np.intp)
+        n, row = self.n, self.row
+        m = n - d
+        for i in self.ids[rows].tolist():
+            del row[i]
+        holes = rows[rows < m]
+        if len(holes):
+            tail = np.arange(m, n)
+            movers = tail[~np.isin(tail, rows)]
+            for name in self._fields:
+                arr = getattr(self, name)
+                arr[holes] = arr[movers]
+            row.update(zip(self.ids[holes].tolist(), holes.tolist()))
+        self.n = m
+        return d
+
+    def compact(self, keep) -> int:
+        """Keep only the live rows where the boolean mask `keep` is set, in
+        order; return the number dropped. O(population), for bulk filters."""
+        n = self.n
+        m = int(keep.sum())
+        if m < n:
+            for name in self._fields:
+                arr = getattr(self, name)
+                arr[:m] = arr[:n][keep]
+            self.n = m
+            self.row = dict(zip(self.ids[:m].tolist(), range(m)))
+        return n - m
+
+    def trail_points(self, j):
+        """(M, 2) int positions of every critter's j-th most recent trail point."""
+        n = self.n
+        slot = (self.trail_head - j) % self.trail_cap
+        return self.trail[:n, slot][self.trail_n[:n] >= j].astype(np.intp)
+
+    def draw_trails(self, surf):
+        # draw trails with fading alpha, oldest points first, from cached sprites
+        k = self.trail_keep
+        for j in range(k, 0, -1):
+            sprite = trail_sprite(int(255 * (k - j + 1) / k))
+            pts = self.trail_points(j) - 2
+            surf.blits([(sprite, p) for p in pts.tolist()], doreturn=False)
+
+    def render_groups(self):
+        """(positions, colour, radius) groups for CritterRenderer."""
+        return [(self.pos[:self.n], CRITTER_COLOR, self.size)]
+
+HERD_COLOR = np.array((150, 190, 90), dtype=np.float32)
+MAX_AGE_RANGE = (200.0, 500.0)  # max_age of new critters is uniform over this range
+
+class HerdField:
+    """Continuum level of detail for dense herds (--lod).
+
+    Where critters crowd an algae cell they are absorbed into per-cell fields:
+    `dens` (critters per cell), plus `energy` and `age` (summed over them).
+    Each tick the field drifts up the algae gradient at the foraging bias
+    speed and diffuses like the random walk. The transport is an upwind,
+    mass-conserving scheme. The field eats like the agents and breeds where
+    the mean energy reaches the mating threshold. It dies at the
+    uniform-lifespan hazard for the cell's mean age, or all at once when its
+    energy runs out. Cells whose density drops below `lo` turn
+    back into individual critters. The cost per tick depends on the grid size,
+    not the population.
+    """
+    def __init__(self, algae: AlgaeGrid, speed, dt, hi=6.0, lo=2.0):
+        self.cell = algae.cell
+        self.hi, self.lo = hi, lo
+        self.dens = np.zeros_like(algae.grid)
+        self.energy = np.zeros_like(algae.grid)
+        self.age = np.zeros_like(algae.grid)
+        # random walk with step speed*dt -> D = (speed*dt)^2 / (4 dt); drift = bias weight * speed
+        self.k_diff = speed * speed * dt / 4 * dt / self.cell ** 2
+        self.k_adv = 0.3 * speed * dt / self.cell
+        self._raster = pygame.Surface((algae.cols, algae.rows))
+        self._scaled = pygame.Surface((algae.cols * algae.cell, algae.rows * algae.cell))
+
+    def total(self):
+        return float(self.dens.sum(dtype=np.float64))
+
+    def _cells(self, pos):
+        r = (pos[:, 1] // self.cell).astype(np.intp) % self.dens.shape[0]
+        c = (pos[:, 0] // self.cell).astype(np.intp) % self.dens.shape[1]
+        return r * self.dens.shape[1] + c
+
+    def step(self, algae: AlgaeGrid, dt):
+        """Move, feed and thin the field; returns (critters fed, critters died)."""
+        d, e, age = self.dens, self.energy, self.age
+        fed = self.total()
+        if fed == 0.0:
+            return 0.0, 0.0
+        a = algae.grid
+        gx = np.roll(a, -1, 1) - np.roll(a, 1, 1)
+        gy = np.roll(a, -1, 0) - np.roll(a, 1, 0)
+        norm = np.hypot(gx, gy)
+        norm[norm < 1e-6] = np.inf
+        gx /= norm; gy /= norm
+        fe = self.k_diff + self.k_adv * np.maximum(gx, 0)
+        fw = self.k_diff + self.k_adv * np.maximum(-gx, 0)
+        fs = self.k_diff + self.k_adv * np.maximum(gy, 0)
+        fn = self.k_diff + self.k_adv * np.maximum(-gy, 0)
+        stay = 1.0 - (fe + fw + fs + fn)
+        for f in (d, e, age):
+            moved = (np.roll(f * fe, 1, 1) + np.roll(f * fw, -1, 1)
+                     + np.roll(f * fs, 1, 0) + np.roll(f * fn, -1, 0))
+            f *= stay
+            f += moved
+        taken = np.minimum(a, d * (0.2 * dt))
+        a -= taken
+        algae._sum -= float(taken.sum(dtype=np.float64))
+        algae.dirty = True
+        e += 2.0 * taken - (0.02 * dt) * d
+        age += dt * d
+        # hazard of a uniform(lo, hi) lifespan at the cell's mean age: 0 before lo, 1/(hi - a) after
+        lo, hi = MAX_AGE_RANGE
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_age = np.where(d > 0, age / d, 0.0)
+        frac = np.where(mean_age < lo, 0.0, np.minimum(1.0, dt / np.maximum(hi - mean_age, dt)))
+        frac[e <= 0] = 1.0  # starved
+        lost = d * frac
+        for f in (d, e, age):
+            f *= 1.0 - frac
+        return fed, float(lost.sum(dtype=np.float64))
+
+    def reproduce(self, threshold, child_energy, parent_keep, room):
+        """Mean-field mating: where the mean energy allows it, half the cell pairs up once."""
+        d, e = self.dens, self.energy
+        ok = (d >= 2.0) & (e >= threshold * d)
+        births = np.where(ok, 0.5 * d, 0.0).astype(np.float32)
+        total = float(births.sum(dtype=np.float64))
+        if total <= 0.0 or room <= 0:
+            return 0.0
+        if total > room:
+            births *= room / total
+            total = room
+        with np.errstate(invalid='ignore', divide='ignore'):
+            parents = np.where(ok, 2.0 * births / d, 0.0)
+        e *= 1.0 - parents * (1.0 - parent_keep)
+        e += births * child_energy
+        d += births  # newborns add no age
+        return total
+
+    def absorb(self, pop: Population):
+        """Fold critters standing in cells whose total occupancy reaches `hi` into the field."""
+        n = pop.n
+        if not n:
+            return 0
+        flat = self._cells(pop.pos[:n])
+        d = self.dens.reshape(-1)
+        count = np.bincount(flat, minlength=d.size)
+        take = (count + d >= self.hi)[flat]
+        if not take.any():
+            return 0
+        d += np.bincount(flat[take], minlength=d.size)
+        for field, values in ((self.energy, pop.energy), (self.age, pop.age)):
+            field.reshape(-1)[:] += np.bincount(flat[take], weights=values[:n][take], minlength=d.size)
+        return pop.remove(np.flatnonzero(take))
+
+    def emit(self, pop: Population, rng):
+        """Turn cells below `lo` critters back into agents (stochastic rounding)."""
+        d, e, age = self.dens.reshape(-1), self.energy.reshape(-1), self.age.reshape(-1)
+        idx = np.flatnonzero((d > 0) & (d < self.lo))
+        if not len(idx):
+            return 0
+        k = (d[idx] + rng.random(len(idx))).astype(np.intp)
+        cells = np.repeat(idx, k)
+        if len(cells):
+            r, c = np.divmod(cells, self.dens.shape[1])
+            pos = (np.stack((c, r), axis=1) + rng.random((len(cells), 2))) * self.cell
+            energy = np.repeat(e[idx] / d[idx], k)
+            mean_age = np.repeat(age[idx] / d[idx], k)
+            # lifespans conditioned on having survived to the cell's mean age
+            max_age = rng.uniform(np.maximum(mean_age, MAX_AGE_RANGE[0]), MAX_AGE_RANGE[1])
+            pop.add(pos, rng.uniform(-1, 1, (len(cells), 2)), energy, max_age, mean_age)
+        d[idx] = 0.0
+        e[idx] = 0.0
+        age[idx] = 0.0
+        return len(cells)
 
     def draw(self, surf):
-        # draw trail with fading alpha
-        for i, p in enumerate(self.trail):
-            alpha = int(255 * (i+1)/len(self.trail))
-            col = (180, 220, 120, alpha)
-            trail_surf = pygame.Surface((4,4), pygame.SRCALPHA)
-            pygame.draw.circle(trail_surf, col, (2,2), 2)
-            surf.blit(trail_surf, (int(p.x)-2, int(p.y)-2))
-        # draw critter body
-        pygame.draw.circle(surf, (180, 220, 120), (int(self.pos.x), int(self.pos.y)), self.size)
+        top = float(self.dens.max())
+        if top <= 0:
+            return
+        level = np.log1p(self.dens.T) / np.float32(np.log1p(top))
+        pygame.surfarray.blit_array(self._raster, (level[..., None] * HERD_COLOR).astype(np.uint8))
+        pygame.transform.scale(self._raster, self._scaled.get_size(), self._scaled)
+        surf.blit(self._scaled, (0, 0), special_flags=pygame.BLEND_ADD)
+
+class TrailLayer:
+    """Persistent trail layer: each frame it decays by one step and only the
+    positions recorded since the previous frame are stamped, so the cost does
+    not depend on trail length."""
+    def __init__(self, w, h):
+        self.surf = pygame.Surface((w, h), pygame.SRCALPHA)
+        self.last_step = 0
+
+    def draw(self, surf, pop: Population):
+        # subtractive decay: a multiplicative one stalls at a small alpha through integer rounding
+        keep = max(pop.trail_keep, 1)
+        self.surf.fill((0, 0, 0, max(1, 255 // keep)), special_flags=pygame.BLEND_RGBA_SUB)
+        fresh = min(pop.steps - self.last_step, pop.trail_cap)
+        self.last_step = pop.steps
+        sprite = trail_sprite(255)
+        for j in range(fresh, 0, -1):
+            pts = pop.trail_points(j) - 2
+            self.surf.blits([(sprite, p) for p in pts.tolist()], doreturn=False)
+        surf.blit(self.surf, (0, 0))
 
 class Button:
     def __init__(self, rect, label, action):
@@ -205,6 +610,147 @@ class Button:
         txt = font.render(self.label, True, (230, 230, 230))
         surf.blit(txt, txt.get_rect(center=self.rect.center))
 
+class PopPlot:
+    """Population (left axis, autoscaled) and mean algae (right axis, fixed
+    full scale) mini-plot kept on a persistent surface.
+
+    Samples are decimated into at most one slot per pixel column, each holding
+    min/max/last, so a very long --pop-hist costs no more to draw than a short
+    one. A newly closed slot scrolls the surface and draws just that segment;
+    the whole curve is redrawn only when the population axis maximum changes.
+    """
+    POP_COLOR = (200, 220, 220, 230)
+    ALG_COLOR = (120, 210, 140, 230)
+
+    def __init__(self, w, h, capacity, algae_scale=1.0):
+        self.w, self.h = w, h
+        plot_w = w - 4
+        self.slots = max(2, min(capacity, plot_w + 1))
+        self.per_slot = max(1, math.ceil(capacity / self.slots))
+        self.sx = max(1, plot_w // (self.slots - 1))
+        self.pop = deque(maxlen=self.slots)   # (min, max, last) per closed slot
+        self.alg = deque(maxlen=self.slots)
+        self._open = None                     # slot being filled
+        self.alg_full = max(algae_scale, 1e-6)
+        self.pop_max = 1
+        self.samples = 0
+        self.latest = None
+        self.bg = pygame.Surface((w, h), pygame.SRCALPHA)
+        pygame.draw.rect(self.bg, (20, 20, 28, 200), (0, 0, w, h), border_radius=8)
+        pygame.draw.rect(self.bg, (150, 150, 150, 220), (0, 0, w, h), 2, border_radius=8)
+        self.layer = pygame.Surface((w, h), pygame.SRCALPHA)
+        self._labels = {}
+
+    def add(self, pop, algae):
+        self.samples += 1
+        self.latest = (pop, algae)
+        o = self._open
+        if o is None:
+            o = self._open = [0, pop, pop, algae, algae]
+        o[0] += 1
+        o[1] = min(o[1], pop); o[2] = max(o[2], pop)
+        o[3] = min(o[3], algae); o[4] = max(o[4], algae)
+        if o[0] >= self.per_slot:
+            self._open = None
+            self._close((o[1], o[2], pop), (o[3], o[4], algae))
+
+    def _close(self, p, a):
+        full = len(self.pop) == self.slots
+        evicted = self.pop[0] if full else None
+        self.pop.append(p)
+        self.alg.append(a)
+        new_max = self.pop_max
+        if p[1] > new_max:
+            new_max = p[1]
+        elif evicted is not None and evicted[1] >= self.pop_max:
+            new_max = max(1, max(s[1] for s in self.pop))
+        if new_max != self.pop_max:
+            self.pop_max = new_max
+            self._redraw()
+            return
+        i = len(self.pop) - 1
+        if full:
+            x = 2 + i * self.sx
+            self.layer.scroll(-self.sx, 0)
+            self.layer.fill((0, 0, 0, 0), (x - self.sx + 1, 0, self.w, self.h))
+        self._draw_slot(i)
+
+    def _y_pop(self, v):
+        return self.h - 4 - (self.h - 20) * (v / self.pop_max)
+
+    def _y_alg(self, a):
+        return self.h - 4 - (self.h - 20) * (max(0.0, min(a, self.alg_full)) / self.alg_full)
+
+    def _draw_slot(self, i):
+        x = 2 + i * self.sx
+        for series, ymap, col in ((self.pop, self._y_pop, self.POP_COLOR), (self.alg, self._y_alg, self.ALG_COLOR)):
+            lo, hi, last = series[i]
+            if i > 0:
+                pygame.draw.line(self.layer, col, (x - self.sx, ymap(series[i-1][2])), (x, ymap(last)), 2)
+            if lo != hi or i == 0:
+                pygame.draw.line(self.layer, col, (x, ymap(lo)), (x, ymap(hi)), 2)
+
+    def _redraw(self):
+        self.layer.fill((0, 0, 0, 0))
+        for i in range(len(self.pop)):
+            self._draw_slot(i)
+
+    def _label(self, font, text, color):
+        img = self._labels.get(text)
+        if img is None:
+            if len(self._labels) > 256:
+                self._labels.clear()
+            img = self._labels[text] = font.render(text, True, color)
+        return img
+
+    def draw(self, surf, font, pos):
+        surf.blit(self.bg, pos)
+        px, py = pos
+        if self.samples >= 2:
+            surf.blit(self.layer, pos)
+            pop, algae = self.latest
+            surf.blit(self._label(font, f"pop {pop}", (230, 230, 230)), (px + 8, py + 6))
+            lbl_alg = self._label(font, f"algae {algae:.2f}", (180, 240, 190))
+            surf.blit(lbl_alg, (px + self.w - lbl_alg.get_width() - 8, py + 6))
+        else:
+            surf.blit(self._label(font, "pop: --   algae: --", (230, 230, 230)), (px + 8, py + 6))
+
+class PhaseProfiler(PhaseTimer):
+    """PhaseTimer that also keeps a short rolling window per phase for the
+    on-screen overlay (toggled with P)."""
+    def __init__(self, window=120, history=20000):
+        super().__init__(history)
+        self.recent = defaultdict(lambda: deque(maxlen=window))
+        self.show = False
+
+    def lap(self, name, t0):
+        t = super().lap(name, t0)
+        self.recent[name].append(t - t0)
+        return t
+
+    def overlay(self):
+        """{phase: (mean ms, p95 ms)} over the rolling window, for the on-screen table."""
+        rows = {}
+        for name, win in self.recent.items():
+            a = np.fromiter(win, dtype=float) * 1000.0
+            rows[name] = (float(a.mean()), float(np.percentile(a, 95)))
+        return rows
+
+    def draw(self, surf, font, pos=(10, 40), rows=None):
+        rows = sorted((self.overlay() if rows is None else rows).items())
+        panel = pygame.Surface((280, 20 * (len(rows) + 1) + 8), pygame.SRCALPHA)
+        panel.fill((20, 20, 28, 200))
+        def row(y, cols, color):
+            # columns are right-aligned at fixed x so proportional fonts line up too
+            panel.blit(font.render(cols[0], True, color), (8, y))
+            for text, right in zip(cols[1:], (200, 270)):
+                img = font.render(text, True, color)
+                panel.blit(img, (right - img.get_width(), y))
+        row(4, ("phase", "mean ms", "p95 ms"), (230, 230, 230))
+        for i, (name, (mean, p95)) in enumerate(rows, start=1):
+            row(4 + 20 * i, (name, f"{mean:.2f}", f"{p95:.2f}"), (200, 220, 220))
+        surf.blit(panel, pos)
+
 class Simulation:
     def __init__(self, args):
 
@@ -216,186 +762,714 @@ class Simulation:
         if not hasattr(self.args, 'pop_panel_w'):       self.args.pop_panel_w = 240
         if not hasattr(self.args, 'pop_panel_h'):       self.args.pop_panel_h = 120
         if not hasattr(self.args, 'algae_scale'):       self.args.algae_scale = 1.0  # 0..1 fills panel
+        if not hasattr(self.args, 'forage_probes'):     self.args.forage_probes = 5
+        if not hasattr(self.args, 'sense'):             self.args.sense = Population.sense
+        if not hasattr(self.args, 'debug_aggregates'):  self.args.debug_aggregates = False
+        if not hasattr(self.args, 'trail_len'):         self.args.trail_len = 30
+        if not hasattr(self.args, 'trail_layer'):       self.args.trail_layer = False
+        if not hasattr(self.args, 'render'):            self.args.render = 'auto'
+        if not hasattr(self.args, 'density_above'):     self.args.density_above = 3000
+        if not hasattr(self.args, 'cell'):              self.args.cell = 8
+        if not hasattr(self.args, 'lod'):               self.args.lod = False
+        if not hasattr(self.args, 'lod_hi'):            self.args.lod_hi = 6.0
+        if not hasattr(self.args, 'lod_lo'):            self.args.lod_lo = 2.0
+        if not hasattr(self.args, 'repro_threshold'):   self.args.repro_threshold = Population.repro_threshold
+        if not hasattr(self.args, 'repro_algae_min'):   self.args.repro_algae_min = 0.06
+        if not hasattr(self.args, 'mate_radius'):       self.args.mate_radius = 10.0
+        if not hasattr(self.args, 'child_energy'):      self.args.child_energy = 0.7
+        if not hasattr(self.args, 'parent_keep'):       self.args.parent_keep = 0.65
 
         self.w, self.h = args.width, args.height
         self.env = Environment()
-        self.algae = AlgaeGrid(self.w, self.h, cell=8, init_level=args.algae_init)
+        self.rng = np.random.default_rng(random.getrandbits(64))
+        self.algae = AlgaeGrid(self.w, self.h, cell=args.cell, init_level=args.algae_init, rng=self.rng,
+                               debug=self.args.debug_aggregates)
         self.plant = Plant(biomass=0.3)
-        self.critters: List[Critter] = []
-        for _ in range(args.herbivores):
-            self.critters.append(self._mk_critter())
+        self.critters = Population(capacity=max(256, args.herbivores), trail_cap=max(1, args.trail_len))
+        self.trail_layer = TrailLayer(self.w, self.h) if args.trail_layer else None
+        self.renderer = CritterRenderer(self.w, self.h, self.args.render, self.args.density_above)
+        self.critters.sense = args.sense
+        self.critters.repro_threshold = args.repro_threshold
+        self.herd = HerdField(self.algae, self.critters.speed, args.tick_ms / 1000.0,
+                              self.args.lod_hi, self.args.lod_lo) if self.args.lod else None
+        self._spawn_critters(args.herbivores)
         self.time_scale = 1.0
         self.paused = False
         self.args = args
-        # population history buffering for small plot panel
-        self.algae_history = deque(maxlen=self.args.pop_hist)
-        self.pop_history = deque(maxlen=self.args.pop_hist)
+        # population history for the small plot panel (decimated, persistent surface)
+        self.pop_plot = PopPlot(self.args.pop_panel_w, self.args.pop_panel_h, self.args.pop_hist, self.args.algae_scale)
         self.pop_sample_accum = 0.0
+        self.prof = PhaseProfiler()
+        self.recorder = None
+        self.telemetry = None
+        self.sim_time = 0.0
+
+    def start_recording(self, path, keyframe_every=500, chunk_ticks=50):
+        """Record every following tick (plus the current state) to `path` for --replay."""
+        self.recorder = TickRecorder(path, self.w, self.h, self.algae.grid.shape, self.args.tick_ms / 1000.0,
+                                     keyframe_every=keyframe_every, chunk_ticks=chunk_ticks)
+        self._record()
+
+    def _record(self):
+        pop, env = self.critters, self.env
+        self.recorder.record(self.prof.ticks, pop.ids[:pop.n], pop.pos[:pop.n], self.algae.grid,
+                             (env.o2, env.co2, env.nutrients, self.algae.total_biomass(), pop.n))
+
+    def start_telemetry(self, path, every=1.0):
+        """Append stats() to the columnar store at `path` every `every` sim seconds."""
+        self.telemetry = TelemetrySampler(path, every, meta={'sim': 'terrasim4', 'dt': self.args.tick_ms / 1000.0})
+
+    def close(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+        if self.telemetry is not None:
+            self.telemetry.close()
+            self.telemetry = None
+
+    def entities(self):
+        ent = {'critters': len(self.critters), 'algae_cells': int(self.algae.grid.size)}
+        if self.herd is not None:
+            ent['herd'] = round(self.herd.total())
+        return ent
+
+    def population(self):
+        """Individual critters plus those held in the herd field."""
+        return len(self.critters) + (round(self.herd.total()) if self.herd is not None else 0)
 
-    def _mk_critter(self):
-        return Critter(pos=Vec(random.uniform(0, self.w), random.uniform(0, self.h)),
-                       vel=Vec(random.uniform(-1,1), random.uniform(-1,1)), energy=1.0,
-                       max_age=random.uniform(200, 500), repro_threshold=1.1)
+    def _new_critters(self, k):
+        """Attributes for k fresh critters at random positions."""
+        rng = self.rng
+        pos = rng.uniform((0, 0), (self.w, self.h), (k, 2))
+        vel = rng.uniform(-1, 1, (k, 2))
+        return pos, vel, np.full(k, 1.0), rng.uniform(*MAX_AGE_RANGE, k)
+
+    def _spawn_critters(self, k):
+        self.critters.add(*self._new_critters(k))
 
     def update(self, dt):
         if self.paused:
             return
-        dt *= self.time_scale
+        prof = self.prof
+        t = time.perf_counter()
         self.algae.grow(self.env, dt)
+        t = prof.lap('grow', t)
         self.plant.update(self.env, dt)
-        for c in self.critters:
-            bias = c.forage_bias(self.algae)
-            c.step(dt, self.w, self.h, bias)
-            c.eat(self.algae, dt)
-            self.env.o2 = clamp(self.env.o2 - 0.0001 * dt, 0.0, 0.35)
-            self.env.co2 = clamp(self.env.co2 + 0.00008 * dt, 0.0, 0.01)
-        before = len(self.critters)
-        self.critters = [c for c in self.critters if c.alive()]
-        deaths = before - len(self.critters)
+        t = prof.lap('plant', t)
+        pop = self.critters
+        n = pop.n
+        if n:
+            bias = forage_directions(self.algae, pop.pos[:n], pop.sense, self.args.forage_probes, self.rng)
+            t = prof.lap('forage', t)
+            pop.step(dt, self.w, self.h, bias, self.rng)
+            t = prof.lap('step', t)
+            pop.energy[:n] += 2.0 * self.algae.eat_many(pop.pos[:n], 0.2 * dt)
+            self.env.o2 = clamp(self.env.o2 - 0.0001 * dt * n, 0.0, 0.35)
+            self.env.co2 = clamp(self.env.co2 + 0.00008 * dt * n, 0.0, 0.01)
+            t = prof.lap('eat', t)
+        deaths = pop.cull()
+        if self.herd is not None:
+            fed, died = self.herd.step(self.algae, dt)
+            self.env.o2 = clamp(self.env.o2 - 0.0001 * dt * fed, 0.0, 0.35)
+            self.env.co2 = clamp(self.env.co2 + 0.00008 * dt * fed, 0.0, 0.01)
+            deaths += died
         self.env.nutrients = clamp(self.env.nutrients + 0.01 * deaths, 0.0, 1.0)
+        t = prof.lap('cull', t)
         self._reproduce()
+        t = prof.lap('reproduce', t)
+        if self.herd is not None:
+            self.herd.absorb(pop)
+            self.herd.emit(pop, self.rng)
+            t = prof.lap('lod', t)
+        prof.ticks += 1
+        if self.recorder is not None:
+            self._record()
+            t = prof.lap('record', t)
+        self.sim_time += dt
+        if self.telemetry is not None:
+            self.telemetry.offer(self.sim_time, self.stats)
+            prof.lap('telemetry', t)
 
         # sample population for plot
         self.pop_sample_accum += dt
         if self.pop_sample_accum >= self.args.pop_sample_every:
             try:
-                count = len(self.critters)
+                count = self.population()
             except AttributeError:
                 count = len(self.herbivores) if hasattr(self, 'herbivores') else 0
-            self.pop_history.append(count)
-        
-            # sample algae mean biomass (0..1)
-            self.algae_history.append(self.algae.total_biomass())
-        
+            # with mean algae biomass (0..1)
+            self.pop_plot.add(count, self.algae.total_biomass())
             self.pop_sample_accum = 0.0
 
 
+    def _mate_pairs(self, idx, cell):
+        """Pair critters (indices idx) that share a grid cell of size `cell`.
+        Two passes, the second on a half-cell-shifted grid, catch pairs split
+        by a cell border. Returns index arrays (a, b)."""
+        pos = self.critters.pos
+        cols = max(1, int(self.w // cell)); rows = max(1, int(self.h // cell))
+        cw, ch = self.w / cols, self.h / rows
+        out_a, out_b = [], []
+        for shift in (0.0, 0.5):
+            if len(idx) < 2:
+                break
+            cx = ((pos[idx, 0] / cw + shift) // 1).astype(np.intp) % cols
+            cy = ((pos[idx, 1] / ch + shift) // 1).astype(np.intp) % rows
+            order = np.argsort(cy * cols + cx, kind='stable')
+            key = (cy * cols + cx)[order]
+            srt = idx[order]
+            # rank of each entry within its cell; even ranks pair with the next one
+            start = np.r_[0, np.flatnonzero(key[1:] != key[:-1]) + 1]
+            rank = np.arange(len(key)) - np.repeat(start, np.diff(np.r_[start, len(key)]))
+            first = np.flatnonzero((rank % 2 == 0)[:-1] & (key[1:] == key[:-1]))
+            out_a.append(srt[first]); out_b.append(srt[first + 1])
+            paired = np.zeros(len(srt), dtype=bool)
+            paired[first] = True; paired[first + 1] = True
+            idx = srt[~paired]
+        if not out_a:
+            return np.empty(0, np.intp), np.empty(0, np.intp)
+        return np.concatenate(out_a), np.concatenate(out_b)
+
     def _reproduce(self):
-        if self.algae.total_biomass() > 0.06 and len(self.critters) < self.args.animal_cap:
-            random.shuffle(self.critters)
-            for i in range(0, len(self.critters)-1, 2):
-                a, b = self.critters[i], self.critters[i+1]
-                if a.can_reproduce() and b.can_reproduce() and (a.pos - b.pos).length() < (self.w / len(self.critters)) * 10:
-                    child = self._mk_critter()
-                    child.pos = (a.pos + b.pos) / 2
-                    child.energy = 0.7
-                    a.energy *= 0.65; b.energy *= 0.65
-                    self.critters.append(child)
-                    if len(self.critters) >= self.args.animal_cap:
-                        break
+        pop = self.critters
+        n = pop.n
+        room = self.args.animal_cap - int(self.population())
+        args = self.args
+        if self.herd is not None and self.algae.total_biomass() > args.repro_algae_min and room > 0:
+            room -= int(self.herd.reproduce(args.repro_threshold, args.child_energy, args.parent_keep, room))
+        if self.algae.total_biomass() > args.repro_algae_min and room > 0 and n >= 2:
+            max_d = (self.w / n) * args.mate_radius
+            eligible = np.flatnonzero(pop.energy[:n] >= pop.repro_threshold)
+            eligible = self.rng.permutation(eligible)  # random pairing order within a cell
+            a, b = self._mate_pairs(eligible, max_d)
+            wh = np.array((self.w, self.h))
+            d = (pop.pos[b] - pop.pos[a] + wh / 2) % wh - wh / 2  # torus delta a->b
+            ok = np.hypot(d[:, 0], d[:, 1]) < max_d
+            a, b, d = a[ok][:room], b[ok][:room], d[ok][:room]
+            if len(a):
+                pos, vel, energy, max_age = self._new_critters(len(a))
+                pos = (pop.pos[a] + d / 2) % wh
+                energy[:] = args.child_energy
+                pop.energy[a] *= args.parent_keep; pop.energy[b] *= args.parent_keep
+                pop.add(pos, vel, energy, max_age)
+
+    def stats(self):
+        """Environment and population scalars for one time-series row."""
+        row = {'light': round(self.env.light(0), 4), 'o2': round(self.env.o2, 5), 'co2': round(self.env.co2, 6),
+               'nutrients': round(self.env.nutrients, 5), 'water': round(self.env.water, 5),
+               'temp_c': round(self.env.temp_c, 3), 'plant': round(self.plant.biomass, 5),
+               'algae': round(self.algae.total_biomass(), 5), 'critters': len(self.critters)}
+        if self.herd is not None:
+            row['herd'] = round(self.herd.total(), 2)
+        return row
 
     def draw(self, surf, font):
+        prof = self.prof
+        t = time.perf_counter()
         surf.fill((12, 12, 18))
         self.algae.draw(surf)
+        if self.herd is not None:
+            self.herd.draw(surf)
+        t = prof.lap('draw.algae', t)
         self.plant.draw(surf, (self.w//2, self.h//2), radius_max=min(self.w, self.h)//4)
-        for c in self.critters:
-            c.draw(surf)
+        # trails are skipped in density mode, where single critters are not readable anyway
+        if self.renderer.resolve(len(self.critters)) == 'dots':
+            if self.trail_layer is not None:
+                self.trail_layer.draw(surf, self.critters)
+            else:
+                self.critters.draw_trails(surf)
+        t = prof.lap('draw.trails', t)
+        mode = self.renderer.draw(surf, self.critters.render_groups())
+        t = prof.lap('draw.bodies', t)
         hud = f"O2 {self.env.o2:0.3f}  CO2 {self.env.co2:0.4f}  Nutr {self.env.nutrients:0.2f}  Water {self.env.water:0.2f}  Plant {self.plant.biomass:0.2f}  Algae {self.algae.total_biomass():0.2f}  Critters {len(self.critters)}  x{self.time_scale:0.1f}"
+        if self.herd is not None:
+            hud += f"  Herd {self.herd.total():.0f}"
+        if mode == 'density':
+            hud += "  [density]"
         text = font.render(hud, True, (230, 230, 230))
         surf.blit(text, (10, 8))
-        '''
-        # --- population mini-plot panel ---
-        pw, ph = self.args.pop_panel_w, self.args.pop_panel_h
-        px, py = self.w - pw - 10, 40  # top-right under HUD
-        panel = pygame.Surface((pw, ph), pygame.SRCALPHA)
-        # background and frame
-        pygame.draw.rect(panel, (20, 20, 28, 200), (0, 0, pw, ph), border_radius=8)
-        pygame.draw.rect(panel, (150, 150, 150, 220), (0, 0, pw, ph), 2, border_radius=8)
-        '''
-
-        # ---- population + algae mini-plot panel ----
-        pw, ph = self.args.pop_panel_w, self.args.pop_panel_h
-        px, py = self.w - pw - 10, 40  # top-right under HUD
-        panel = pygame.Surface((pw, ph), pygame.SRCALPHA)
-        
-        # background + frame
-        pygame.draw.rect(panel, (20, 20, 28, 200), (0, 0, pw, ph), border_radius=8)
-        pygame.draw.rect(panel, (150, 150, 150, 220), (0, 0, pw, ph), 2, border_radius=8)
-
-
-
-        # plot history if available
-        if len(self.pop_history) >= 2:
-            pop_hist = list(self.pop_history)
-            alg_hist = list(self.algae_history) if len(self.algae_history) == len(self.pop_history) else [0.0]*len(self.pop_history)
-            n = len(pop_hist)
-        
-            # X coordinates
-            dx = pw / (n - 1)
-            xs = [i * dx for i in range(n)]
-        
-            # --- Left axis: animals ---
-            maxy_pop = max(max(pop_hist), 1)
-            pop_pts = []
-            for x, v in zip(xs, pop_hist):
-                y = ph - 4 - (ph - 20) * (v / maxy_pop)     # leave small top/bottom padding
-                pop_pts.append((x, y))
-            pygame.draw.lines(panel, (200, 220, 220, 230), False, pop_pts, 2)
-        
-            # --- Right axis: algae (scaled to --algae-scale, default 1.0) ---
-            alg_full = max(self.args.algae_scale, 1e-6)
-            alg_pts = []
-            for x, a in zip(xs, alg_hist):
-                a_clamped = max(0.0, min(a, alg_full))
-                y = ph - 4 - (ph - 20) * (a_clamped / alg_full)
-                alg_pts.append((x, y))
-            pygame.draw.lines(panel, (120, 210, 140, 230), False, alg_pts, 2)
-        
-            # axes ticks/labels (tiny)
-            lbl_pop = font.render(f"pop {pop_hist[-1]}", True, (230,230,230))
-            panel.blit(lbl_pop, (8, 6))
-            lbl_alg = font.render(f"algae {alg_hist[-1]:.2f}", True, (180, 240, 190))
-            # place algae label near top-right inside panel
-            panel.blit(lbl_alg, (pw - lbl_alg.get_width() - 8, 6))
-            surf.blit(panel, (px, py))
-        
+        t = prof.lap('draw.hud', t)
+        self._draw_plot(surf, font)
+        prof.lap('draw.plot', t)
+        if prof.show:
+            prof.draw(surf, font, rows=self._profile_rows())
+
+    def _profile_rows(self):
+        return self.prof.overlay()
+
+    def _draw_plot(self, surf, font):
+        # ---- population + algae mini-plot panel, top-right under HUD ----
+        self.pop_plot.draw(surf, font, (self.w - self.args.pop_panel_w - 10, 40))
+
+MAX_SPEED = 1000.0  # sim seconds per wall second; beyond what the CPU can do the scheduler saturates
+
+class Scheduler:
+    """Fixed-step sim clock decoupled from the render rate.
+
+    Each frame adds wall time x sim.time_scale to an accumulator that is drained
+    in fixed sim_dt substeps until it is empty or the part of the frame not
+    needed for drawing is used up. Backlog that does not fit is dropped, so a
+    high speed setting runs at full CPU throughput without enlarging dt.
+    """
+    def __init__(self, sim_dt, fps):
+        self.sim_dt = sim_dt
+        self.frame_s = 1.0 / fps
+        self.acc = 0.0
+        self.render_s = 0.0   # smoothed draw+flip time
+        self.substeps = 0     # substeps run in the last frame
+        self.last = self._sim_end = time.perf_counter()
+
+    def advance(self, sim):
+        now = time.perf_counter()
+        wall = min(now - self.last, 0.25)
+        self.last = now
+        self.substeps = 0
+        if sim.paused:
+            self.acc = 0.0
         else:
-            lbl = font.render("pop: --   algae: --", True, (230,230,230))
-            panel.blit(lbl, (8, 6))
-            surf.blit(panel, (px, py))
-
-
-
-
-
-'''
-        # plot history if available
-        if len(self.pop_history) >= 2:
-            hist = list(self.pop_history)
-            maxy = max(max(hist), 1)
-            dx = pw / (len(hist) - 1)
-            pts = []
-            for i, v in enumerate(hist):
-                x = i * dx
-                # invert y: bottom is 0
-                y = ph - 4 - (ph - 8) * (v / maxy)
-                pts.append((x, y))
-            # draw polyline
-            pygame.draw.lines(panel, (200, 220, 220, 230), False, pts, 2)
-            # annotate current value
-            lbl = font.render(f"pop: {hist[-1]}", True, (230,230,230))
-            panel.blit(lbl, (8, 6))
+            self.acc += wall * sim.time_scale
+            deadline = now + max(self.frame_s - self.render_s, 0.25 * self.frame_s)
+            while self.acc >= self.sim_dt:
+                sim.update(self.sim_dt)
+                self.acc -= self.sim_dt
+                self.substeps += 1
+                if time.perf_counter() >= deadline:
+                    self.acc = min(self.acc, self.sim_dt)
+                    break
+        self._sim_end = time.perf_counter()
+
+    def rendered(self):
+        self.render_s = 0.8 * self.render_s + 0.2 * (time.perf_counter() - self._sim_end)
+
+class QueuedPlot:
+    """Stands in for PopPlot on the sim thread: samples go to the render thread,
+    which owns the pygame surfaces. None marks a reset."""
+    def __init__(self, q):
+        self.q = q
+
+    def add(self, pop, algae):
+        self.q.put((pop, algae))
+
+class RenderSnapshot:
+    """Copy of everything Simulation.draw reads, filled on the sim thread.
+    Arrays are reused between fills and only grow."""
+    _pop_fields = ('pos', 'trail', 'trail_n')
+
+    def __init__(self):
+        self.grid = self.dens = None
+        self.pos = self.trail = self.trail_n = None
+        self.tick = -1
+
+    @staticmethod
+    def _rows(buf, src, n):
+        if buf is None or len(buf) < n or buf.shape[1:] != src.shape[1:]:
+            buf = np.empty((max(n, 256, 2 * len(buf) if buf is not None else 0),) + src.shape[1:], src.dtype)
+        buf[:n] = src[:n]
+        return buf
+
+    @staticmethod
+    def _whole(buf, src):
+        if buf is None or buf.shape != src.shape:
+            buf = np.empty_like(src)
+        np.copyto(buf, src)
+        return buf
+
+    def fill(self, sim):
+        pop = sim.critters
+        n = pop.n
+        self.grid = self._whole(self.grid, sim.algae.grid)
+        for name in self._pop_fields:
+            setattr(self, name, self._rows(getattr(self, name), getattr(pop, name), n))
+        self.dens = self._whole(self.dens, sim.herd.dens) if sim.herd is not None else None
+        self.n, self.steps, self.trail_head, self.trail_keep = n, pop.steps, pop.trail_head, pop.trail_keep
+        self.algae_sum = sim.algae._sum
+        self.env = dataclasses.replace(sim.env)
+        self.plant = sim.plant.biomass
+        self.time_scale, self.paused = sim.time_scale, sim.paused
+        # the profiler itself stays on the sim thread; only the overlay numbers are copied
+        self.prof_show = sim.prof.show
+        self.prof_rows = sim.prof.overlay() if sim.prof.show else {}
+        self.tick = sim.prof.ticks
+
+class SimThread(threading.Thread):
+    """Runs the simulation on its own fixed-step clock in a background thread.
+
+    After every frame's worth of substeps the state is copied into whichever of
+    two RenderSnapshot buffers the renderer is not holding, and that buffer is
+    published as the front one. Input reaches the simulation only through
+    send(fn): fn(sim) runs on this thread between substeps; if it returns a
+    Simulation, that replaces the current one (reset).
+    """
+    def __init__(self, sim, sim_dt, fps):
+        super().__init__(name='terrasim4-sim', daemon=True)
+        self.sim_dt, self.fps = sim_dt, fps
+        self.commands = queue.SimpleQueue()
+        self.plot_samples = queue.SimpleQueue()
+        self._bufs = [RenderSnapshot(), RenderSnapshot()]
+        self._front = self._reading = None
+        self._lock = threading.Lock()
+        self._halt = threading.Event()
+        self._adopt(sim)
+        self._publish()
+
+    def _adopt(self, sim):
+        self.sim = sim
+        sim.pop_plot = QueuedPlot(self.plot_samples)
+
+    def send(self, fn):
+        self.commands.put(fn)
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+    def acquire(self):
+        """Latest published snapshot; it is not overwritten until release()."""
+        with self._lock:
+            self._reading = self._front
+            return self._front
+
+    def release(self):
+        with self._lock:
+            self._reading = None
+
+    def _publish(self):
+        with self._lock:
+            back = self._bufs[1] if self._front is self._bufs[0] else self._bufs[0]
+            if back is self._reading:
+                return  # renderer still holds it (acquired before the last swap); try next frame
+        back.fill(self.sim)
+        with self._lock:
+            self._front = back
+
+    def run(self):
+        sched = Scheduler(self.sim_dt, self.fps)
+        while not self._halt.is_set():
+            t0 = time.perf_counter()
+            while True:
+                try:
+                    fn = self.commands.get_nowait()
+                except queue.Empty:
+                    break
+                new = fn(self.sim)
+                if isinstance(new, Simulation):
+                    self.sim.close()
+                    self._adopt(new)
+                    self.plot_samples.put(None)
+            sched.advance(self.sim)
+            self._publish()
+            self._halt.wait(max(0.0, sched.frame_s - (time.perf_counter() - t0)))
+
+class RenderView:
+    """Render-thread stand-in for Simulation: Simulation.draw runs on it with
+    its arrays pointed at the latest RenderSnapshot."""
+    draw_state = Simulation.draw
+    _draw_plot = Simulation._draw_plot
+
+    def __init__(self, sim):
+        self.args, self.w, self.h = sim.args, sim.w, sim.h
+        self.algae = AlgaeGrid(self.w, self.h, cell=sim.algae.cell)
+        self.critters = Population(capacity=1, trail_cap=sim.critters.trail_cap)
+        self.herd = HerdField(self.algae, Population.speed, sim.args.tick_ms / 1000.0) if sim.herd is not None else None
+        self.plant = Plant()
+        self.renderer = sim.renderer
+        self.trail_layer = TrailLayer(self.w, self.h) if sim.trail_layer is not None else None
+        self.prof = PhaseProfiler()   # draw phases of the render thread
+        self._sim_rows = {}
+        self._new_plot()
+        self._tick = None
+
+    def _profile_rows(self):
+        return {**self._sim_rows, **self.prof.overlay()}
+
+    def _new_plot(self):
+        a = self.args
+        self.pop_plot = PopPlot(a.pop_panel_w, a.pop_panel_h, a.pop_hist, a.algae_scale)
+
+    def draw(self, surf, font, snap, samples):
+        while True:
+            try:
+                item = samples.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._new_plot()
+            else:
+                self.pop_plot.add(*item)
+        self.algae.grid, self.algae._sum = snap.grid, snap.algae_sum
+        self.algae.dirty = snap.tick != self._tick
+        self._tick = snap.tick
+        pop = self.critters
+        pop.pos, pop.trail, pop.trail_n = snap.pos, snap.trail, snap.trail_n
+        pop.n, pop.steps, pop.trail_head, pop.trail_keep = snap.n, snap.steps, snap.trail_head, snap.trail_keep
+        if self.herd is not None:
+            self.herd.dens = snap.dens
+        self.env, self.plant.biomass = snap.env, snap.plant
+        self.time_scale = snap.time_scale
+        self.prof.show, self._sim_rows = snap.prof_show, snap.prof_rows
+        self.draw_state(surf, font)
+
+class VideoExporter:
+    """Encode rendered frames on a background writer thread.
+
+    push() copies the offscreen surface into one of `queue_frames` preallocated
+    RGB buffers and queues it. When every buffer is in flight it blocks, so
+    memory stays flat and the simulation never runs far ahead of the encoder.
+    Frames are piped raw to an ffmpeg process, or for a .png path written as a
+    numbered image sequence (path may contain a %d pattern).
+    """
+    def __init__(self, path, size, fps=30, queue_frames=8, ffmpeg='ffmpeg'):
+        self.w, self.h = size
+        self.frames = 0
+        self.error = None
+        self.proc = None
+        self.free = queue.Queue()
+        self.full = queue.Queue()
+        for _ in range(max(1, queue_frames)):
+            self.free.put(np.empty((self.h, self.w, 3), dtype=np.uint8))
+        if path.lower().endswith('.png'):
+            self.pattern = path if '%' in path else path[:-4] + '_%06d.png'
+            os.makedirs(os.path.dirname(self.pattern) or '.', exist_ok=True)
         else:
-            lbl = font.render("pop: --", True, (230,230,230))
-            panel.blit(lbl, (8, 6))
-        surf.blit(panel, (px, py))
-'''
+            self.pattern = None
+            cmd = [ffmpeg, '-y', '-loglevel', 'error', '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+                   '-s', f'{self.w}x{self.h}', '-r', str(fps), '-i', '-',
+                   '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p', path]
+            try:
+                self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+            except FileNotFoundError:
+                raise SystemExit(f"{ffmpeg} not found; install ffmpeg or export a .png sequence instead")
+        self.thread = threading.Thread(target=self._run, name='video-writer', daemon=True)
+        self.thread.start()
 
-def main(argv=None):
+    def push(self, surf):
+        buf = self.free.get()
+        px = pygame.surfarray.pixels3d(surf)
+        np.copyto(buf, px.transpose(1, 0, 2))
+        del px
+        self.full.put(buf)
+
+    def _run(self):
+        while True:
+            buf = self.full.get()
+            if buf is None:
+                break
+            if self.error is None:
+                try:
+                    if self.proc is not None:
+                        self.proc.stdin.write(buf.data)
+                    else:
+                        img = pygame.image.frombuffer(buf.data, (self.w, self.h), 'RGB')
+                        pygame.image.save(img, self.pattern % self.frames)
+                    self.frames += 1
+                except (OSError, pygame.error) as e:
+                    self.error = e
+            self.free.put(buf)
+
+    def close(self):
+        self.full.put(None)
+        self.thread.join()
+        if self.proc is not None:
+            try:
+                self.proc.stdin.close()
+            except OSError:
+                pass
+            if self.proc.wait() != 0 and self.error is None:
+                self.error = RuntimeError(f"ffmpeg exited with status {self.proc.returncode}")
+        if self.error is not None:
+            raise SystemExit(f"video export failed after {self.frames} frames: {self.error}")
+
+def run_headless(args):
+    """Fixed-step batch run without a display: step the simulation as fast as the
+    CPU allows, stream stats rows to --out (CSV) and report ticks/second.
+    With --video every --video-every'th tick is also rendered offscreen and
+    handed to a VideoExporter."""
+    sim = Simulation(args)
+    if args.record:
+        sim.start_recording(args.record, args.record_keyframe, args.record_chunk)
+    if args.telemetry:
+        sim.start_telemetry(args.telemetry, args.telemetry_every)
+    dt = args.tick_ms / 1000.0
+    ticks = int(round(args.sim_seconds / dt))
+    every = max(1, int(round(args.stats_every / dt)))
+    out = open(args.out, 'w', newline='') if args.out else None
+    writer = None
+    video = None
+    if args.video:
+        pygame.font.init()
+        font = pygame.font.SysFont('consolas', 16)
+        frame = pygame.Surface((args.width, args.height))
+        video = VideoExporter(args.video, frame.get_size(), args.video_fps, args.video_queue, args.ffmpeg)
+    start = time.perf_counter()
+    try:
+        for tick in range(1, ticks + 1):
+            sim.update(dt)
+            if out is not None and tick % every == 0:
+                row = {'t': round(tick * dt, 6), **sim.stats()}
+                if writer is None:
+                    writer = csv.DictWriter(out, fieldnames=list(row))
+                    writer.writeheader()
+                writer.writerow(row)
+            if video is not None and tick % args.video_every == 0:
+                sim.draw(frame, font)
+                video.push(frame)
+    finally:
+        if out is not None:
+            out.close()
+        sim.close()
+        if video is not None:
+            video.close()
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"{ticks} ticks ({ticks * dt:.0f} sim-s) in {elapsed:.2f}s: {ticks / elapsed:.1f} ticks/s"
+          + (f", {video.frames} video frames -> {args.video}" if video is not None else ""))
+    if args.profile_out:
+        sim.prof.dump(args.profile_out, sim.entities())
+    return sim
+
+def run_replay(args):
+    """Play back a --record file without simulating. Space pauses, Left/Right set
+    the direction, +/- double or halve the ticks per frame, Home/End jump to the
+    ends, D cycles the critter render mode and clicking the bar at the bottom
+    seeks."""
+    rp = Replay(args.replay)
+    w, h = rp.header['width'], rp.header['height']
+    rows, cols = rp.grid_shape
+    cell = w // cols
+    pygame.init()
+    screen = pygame.display.set_mode((w, h))
+    pygame.display.set_caption(f"replay {args.replay}")
+    clock = pygame.time.Clock()
+    font = pygame.font.SysFont('consolas', 16)
+    raster = pygame.Surface((cols, rows))
+    scaled = pygame.Surface((cols * cell, rows * cell))
+    renderer = CritterRenderer(w, h, args.render, args.density_above)
+    bar = pygame.Rect(10, h - 14, w - 20, 6)
+    span = max(1, rp.last_tick - rp.first_tick)
+    tick, direction, speed, paused = rp.first_tick, 1, 1, False
+    running = True
+    while running:
+        for ev in pygame.event.get():
+            if ev.type == pygame.QUIT:
+                running = False
+            elif ev.type == pygame.KEYDOWN:
+                if ev.key == pygame.K_ESCAPE:
+                    running = False
+                elif ev.key == pygame.K_SPACE:
+                    paused = not paused
+                elif ev.key == pygame.K_RIGHT:
+                    direction = 1
+                elif ev.key == pygame.K_LEFT:
+                    direction = -1
+                elif ev.key in (pygame.K_PLUS, pygame.K_EQUALS):
+                    speed = min(speed * 2, 4096)
+                elif ev.key in (pygame.K_MINUS, pygame.K_UNDERSCORE):
+                    speed = max(1, speed // 2)
+                elif ev.key == pygame.K_d:
+                    renderer.cycle()
+                elif ev.key == pygame.K_HOME:
+                    tick = rp.first_tick
+                elif ev.key == pygame.K_END:
+                    tick = rp.last_tick
+            elif ev.type == pygame.MOUSEBUTTONDOWN and ev.button == 1 and bar.inflate(0, 16).collidepoint(ev.pos):
+                tick = rp.first_tick + round((ev.pos[0] - bar.x) / bar.w * span)
+        if not paused:
+            tick += direction * speed
+        tick = min(max(tick, rp.first_tick), rp.last_tick)
+        frame = rp.seek(tick)
+
+        screen.fill((12, 12, 18))
+        pygame.surfarray.blit_array(raster, ALGAE_LUT[frame.algae.T])
+        pygame.transform.scale(raster, scaled.get_size(), scaled)
+        screen.blit(scaled, (0, 0))
+        renderer.draw(screen, [(frame.pos, CRITTER_COLOR, Population.size)])
+        o2, co2, nutr, algae, count = frame.scalars.tolist()
+        hud = (f"O2 {o2:0.3f}  CO2 {co2:0.4f}  Nutr {nutr:0.2f}  Algae {algae:0.2f}  Critters {int(count)}  "
+               f"t {frame.tick * rp.header['dt']:.1f}s  {'<<' if direction < 0 else '>>'} x{speed}"
+               f"{'  paused' if paused else ''}")
+        screen.blit(font.render(hud, True, (230, 230, 230)), (10, 8))
+        pygame.draw.rect(screen, (60, 60, 60), bar)
+        pygame.draw.rect(screen, (200, 220, 220),
+                         (bar.x, bar.y, round(bar.w * (frame.tick - rp.first_tick) / span), bar.h))
+        pygame.display.flip()
+        clock.tick(args.fps)
+    pygame.quit()
+    rp.close()
+
+def make_parser():
     parser = argparse.ArgumentParser()
     parser.add_argument('--width', type=int, default=900)
     parser.add_argument('--height', type=int, default=700)
     parser.add_argument('--tick-ms', type=int, default=50)
     parser.add_argument('--algae-init', type=float, default=0.20)
+    parser.add_argument('--cell', type=int, default=8, help='algae grid cell size in pixels')
     parser.add_argument('--herbivores', type=int, default=80)
     parser.add_argument('--animal-cap', type=int, default=500)
+    # reproduction rule constants (the knobs terrasweep.py scans)
+    parser.add_argument('--repro-threshold', type=float, default=1.1, help='energy needed to mate')
+    parser.add_argument('--repro-algae-min', type=float, default=0.06, help='mean algae below which nobody mates')
+    parser.add_argument('--mate-radius', type=float, default=10.0, help='mating distance as a multiple of width/N')
+    parser.add_argument('--child-energy', type=float, default=0.7)
+    parser.add_argument('--parent-keep', type=float, default=0.65, help='fraction of energy parents keep after mating')
+    parser.add_argument('--forage-probes', type=positive_int, default=5, help='random headings probed per critter per tick')
+    parser.add_argument('--sense', type=float, default=40.0, help='forage probe distance in pixels')
     parser.add_argument('--pop-hist', type=int, default=600, help='samples kept for population plot')
     parser.add_argument('--pop-sample-every', type=float, default=0.5, help='sim seconds between pop samples')
     parser.add_argument('--pop-panel-w', type=int, default=240)
     parser.add_argument('--pop-panel-h', type=int, default=120)
     parser.add_argument('--algae-scale', type=float, default=1.0,
                     help='right-axis full-scale for algae (1.0 means 0..1 biomass fills panel)')
+    parser.add_argument('--trail-len', type=int, default=30, help='max trail points kept per critter')
+    parser.add_argument('--trail-layer', action='store_true',
+                        help='draw trails on a persistent decaying layer (cost independent of trail length)')
+    parser.add_argument('--render', choices=RENDER_MODES, default='auto',
+                        help="critter drawing: dots, density heatmap, or auto (D key cycles)")
+    parser.add_argument('--density-above', type=int, default=3000,
+                        help='critter count above which auto mode switches to the density heatmap')
+    parser.add_argument('--lod', action='store_true',
+                        help='hybrid level of detail: dense crowds become a per-cell herd density field')
+    parser.add_argument('--lod-hi', type=float, default=6.0, help='critters per algae cell at which agents join the field')
+    parser.add_argument('--lod-lo', type=float, default=2.0, help='field density below which a cell turns back into agents')
+    parser.add_argument('--debug-aggregates', action='store_true',
+                        help='cross-check running algae totals against a full recompute every update')
+    parser.add_argument('--fps', type=positive_int, default=30, help='display frame rate cap; sim steps are sub-stepped per frame')
+    parser.add_argument('--threaded', action='store_true',
+                        help='simulate on a background thread; the display loop renders its latest snapshot')
+    parser.add_argument('--headless', action='store_true', help='run without a display as fast as possible')
+    parser.add_argument('--sim-seconds', type=float, default=600.0, help='headless run length in sim seconds')
+    parser.add_argument('--stats-every', type=float, default=1.0, help='sim seconds between headless stats rows')
+    parser.add_argument('--out', default=None, help='CSV file for the headless stats time series')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--video', default=None,
+                        help='headless: render frames offscreen into this video (via ffmpeg) or .png sequence')
+    parser.add_argument('--video-every', type=positive_int, default=1, help='render one video frame every N ticks')
+    parser.add_argument('--video-fps', type=positive_int, default=30, help='frame rate of the encoded video')
+    parser.add_argument('--video-queue', type=int, default=8, help='frames buffered between renderer and encoder')
+    parser.add_argument('--ffmpeg', default='ffmpeg', help='ffmpeg executable used for --video')
+    parser.add_argument('--profile-out', default=None,
+                        help="write per-phase timing summary (JSON) here on exit; '-' for stdout")
+    parser.add_argument('--record', default=None, help='record every tick as compressed deltas to this file')
+    parser.add_argument('--record-keyframe', type=int, default=500, help='ticks between full keyframes')
+    parser.add_argument('--record-chunk', type=int, default=50, help='ticks per compressed delta chunk')
+    parser.add_argument('--telemetry', default=None,
+                        help='append environment and population stats to this columnar store (see terratelemetry.py)')
+    parser.add_argument('--telemetry-every', type=float, default=1.0, help='sim seconds between telemetry rows')
+    parser.add_argument('--replay', default=None, help='play back a --record file instead of simulating')
+    return parser
+
+def main(argv=None):
+    parser = make_parser()
     args = parser.parse_args(argv)
+    if args.record and max(args.width, args.height) > RECORD_MAX_SIDE:
+        parser.error(f"--record supports arenas up to {RECORD_MAX_SIDE} px per side "
+                     f"(positions are stored as int16), got {args.width}x{args.height}")
+    if args.seed is not None:
+        random.seed(args.seed)
+    if args.replay:
+        run_replay(args)
+        return
+    if args.headless or args.video:
+        run_headless(args)
+        return
 
     pygame.init()
     screen = pygame.display.set_mode((args.width, args.height))
@@ -403,6 +1477,36 @@ def main(argv=None):
     font = pygame.font.SysFont('consolas', 16)
 
     sim = Simulation(args)
+    if args.record:
+        sim.start_recording(args.record, args.record_keyframe, args.record_chunk)
+    if args.telemetry:
+        sim.start_telemetry(args.telemetry, args.telemetry_every)
+    base_tick = args.tick_ms
+    if args.threaded:
+        # biology on a background thread; this loop only renders its snapshots
+        worker = SimThread(sim, base_tick / 1000.0, args.fps)
+        view = RenderView(sim)
+        control = worker.send
+        worker.start()
+    else:
+        worker = view = None
+        sched = Scheduler(base_tick / 1000.0, args.fps)
+
+        def control(fn):
+            nonlocal sim
+            new = fn(sim)
+            if isinstance(new, Simulation):
+                sim.close()
+                sim = new
+
+    def spawn(s, k=10):
+        s._spawn_critters(min(k, max(0, args.animal_cap - len(s.critters))))
+
+    def reset(s):
+        # a fresh terrarium keeps appending to the same telemetry store
+        new = Simulation(args)
+        new.telemetry, s.telemetry = s.telemetry, None
+        return new
 
     # UI buttons
     btns = []
@@ -410,12 +1514,11 @@ def main(argv=None):
     def add_btn(x, y, label, action):
         btns.append(Button((x, y, bw, bh), label, action))
     # place at bottom-right
-    add_btn(args.width - (bw+margin)*3, args.height - (bh+margin), '− speed', lambda: setattr(sim, 'time_scale', max(0.1, sim.time_scale/1.5)))
-    add_btn(args.width - (bw+margin)*2, args.height - (bh+margin), 'pause/res', lambda: setattr(sim, 'paused', not sim.paused))
-    add_btn(args.width - (bw+margin)*1, args.height - (bh+margin), '+ speed', lambda: setattr(sim, 'time_scale', min(50.0, sim.time_scale*1.5)))
+    add_btn(args.width - (bw+margin)*3, args.height - (bh+margin), '− speed', lambda: control(lambda s: setattr(s, 'time_scale', max(0.1, s.time_scale/1.5))))
+    add_btn(args.width - (bw+margin)*2, args.height - (bh+margin), 'pause/res', lambda: control(lambda s: setattr(s, 'paused', not s.paused)))
+    add_btn(args.width - (bw+margin)*1, args.height - (bh+margin), '+ speed', lambda: control(lambda s: setattr(s, 'time_scale', min(MAX_SPEED, s.time_scale*1.5))))
 
     running = True
-    base_tick = args.tick_ms
     while running:
         for ev in pygame.event.get():
             # handle buttons (mouse move/click)
@@ -427,20 +1530,42 @@ def main(argv=None):
                 if ev.key == pygame.K_ESCAPE:
                     running = False
                 elif ev.key in (pygame.K_PLUS, pygame.K_EQUALS):
-                    sim.time_scale = min(50.0, sim.time_scale * 1.5)
+                    control(lambda s: setattr(s, 'time_scale', min(MAX_SPEED, s.time_scale * 1.5)))
                 elif ev.key in (pygame.K_MINUS, pygame.K_UNDERSCORE):
-                    sim.time_scale = max(0.1, sim.time_scale / 1.5)
+                    control(lambda s: setattr(s, 'time_scale', max(0.1, s.time_scale / 1.5)))
                 elif ev.key == pygame.K_SPACE:
-                    sim.paused = not sim.paused
-        dt = base_tick / 1000.0
-        sim.update(dt)
-        sim.draw(screen, font)
+                    control(lambda s: setattr(s, 'paused', not s.paused))
+                elif ev.key == pygame.K_p:
+                    control(lambda s: setattr(s.prof, 'show', not s.prof.show))
+                elif ev.key == pygame.K_d:
+                    (view or sim).renderer.cycle()
+                elif ev.key == pygame.K_s:
+                    control(spawn)
+                elif ev.key == pygame.K_r:
+                    control(reset)
+        if worker is not None:
+            snap = worker.acquire()
+            try:
+                view.draw(screen, font, snap, worker.plot_samples)
+            finally:
+                worker.release()
+        else:
+            sched.advance(sim)
+            sim.draw(screen, font)
         # draw buttons
         for b in btns:
             b.draw(screen, font)
         pygame.display.flip()
-        clock.tick(1000 // base_tick)
+        if worker is None:
+            sched.rendered()
+        clock.tick(args.fps)
     pygame.quit()
+    if worker is not None:
+        worker.stop()
+        sim = worker.sim
+    sim.close()
+    if args.profile_out:
+        sim.prof.dump(args.profile_out, sim.entities())
 
 if __name__ == '__main__':
     main()
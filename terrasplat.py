@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Batch critter rendering shared by terrasim.py and terrasim4.py.
+
+Instead of one pygame.draw.circle call per animal, every body of one species
+and size is written into the target surface with a single vectorized scatter
+through pygame.surfarray: the N positions are broadcast against the pixel
+offsets of a filled disc (torus-wrapped at the edges) and assigned in one
+fancy-index store. Surfaces whose pixel format surfarray cannot reference
+fall back to one blits() call with a cached disc sprite.
+
+When a population is too dense for individual dots to be readable, the
+density mode bins positions into `bin_px` squares and adds a log-scaled,
+species-tinted heatmap on top of the scene instead.
+
+Groups are (positions (N, 2), rgb colour, radius) tuples.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pygame
+
+MODES = ('auto', 'dots', 'density')
+
+
+@lru_cache(maxsize=None)
+def disc_offsets(radius: int):
+    """Pixel offsets (dx, dy) from the centre of a filled pygame.draw.circle.
+    The disc is rasterized by pygame itself once per radius, so the footprint
+    is pixel-identical to drawing the circle."""
+    r = int(radius)
+    if r < 1:   # pygame draws nothing at radius 0; keep a one-pixel dot
+        return np.zeros(1, np.intp), np.zeros(1, np.intp)
+    s = pygame.Surface((2 * r + 3, 2 * r + 3), depth=8)
+    s.fill(0)
+    pygame.draw.circle(s, 1, (r + 1, r + 1), r)
+    x, y = np.nonzero(pygame.surfarray.array2d(s))
+    return (x - (r + 1)).astype(np.intp), (y - (r + 1)).astype(np.intp)
+
+
+@lru_cache(maxsize=None)
+def disc_sprite(radius: int, color):
+    r = max(0, int(radius))
+    s = pygame.Surface((max(1, 2 * r), max(1, 2 * r)), pygame.SRCALPHA)
+    dx, dy = disc_offsets(r)
+    for x, y in zip((dx + r).tolist(), (dy + r).tolist()):
+        s.set_at((x, y), color)
+    return s
+
+
+def splat(surf, pos, color, radius):
+    """Draw a filled disc at every row of pos with one scatter into surf's pixels."""
+    if len(pos) == 0:
+        return
+    w, h = surf.get_size()
+    dx, dy = disc_offsets(radius)
+    p = np.asarray(pos).astype(np.intp)
+    try:
+        px = pygame.surfarray.pixels2d(surf)
+    except ValueError:  # e.g. 24-bit surfaces
+        r = max(0, int(radius))
+        sprite = disc_sprite(r, tuple(color))
+        surf.blits([(sprite, xy) for xy in (p - r).tolist()], doreturn=False)
+        return
+    px[(p[:, 0, None] + dx) % w, (p[:, 1, None] + dy) % h] = surf.map_rgb(color)
+    del px  # unlock the surface
+
+
+class DensityLayer:
+    """Log-scaled heatmap of critter counts per bin_px x bin_px square, one tint per group."""
+    def __init__(self, w, h, bin_px=4):
+        self.bin_px = bin_px
+        self.cols, self.rows = -(-w // bin_px), -(-h // bin_px)
+        self._rgb = np.zeros((self.cols, self.rows, 3), dtype=np.float32)
+        self._out = np.zeros((self.cols, self.rows, 3), dtype=np.uint8)
+        self._raster = pygame.Surface((self.cols, self.rows))
+        self._scaled = pygame.Surface((self.cols * bin_px, self.rows * bin_px))
+
+    def draw(self, surf, groups):
+        self._rgb.fill(0.0)
+        for pos, color, _ in groups:
+            if len(pos) == 0:
+                continue
+            b = np.asarray(pos).astype(np.intp) // self.bin_px
+            cnt = np.bincount((b[:, 0] % self.cols) * self.rows + b[:, 1] % self.rows,
+                              minlength=self.cols * self.rows).reshape(self.cols, self.rows)
+            level = np.log1p(cnt, dtype=np.float32) / np.float32(np.log1p(cnt.max()))
+            self._rgb += level[:, :, None] * np.asarray(color, dtype=np.float32)
+        np.clip(self._rgb, 0, 255, out=self._rgb)
+        self._out[:] = self._rgb
+        pygame.surfarray.blit_array(self._raster, self._out)
+        pygame.transform.scale(self._raster, self._scaled.get_size(), self._scaled)
+        surf.blit(self._scaled, (0, 0), special_flags=pygame.BLEND_ADD)
+
+
+class CritterRenderer:
+    """Draw critter groups as dots, as a density heatmap, or ('auto') as
+    whichever suits the current population size."""
+    def __init__(self, w, h, mode='auto', density_above=3000, bin_px=4):
+        self.mode = mode
+        self.density_above = density_above
+        self.layer = DensityLayer(w, h, bin_px)
+        self.last = 'dots'  # mode used by the last draw()
+
+    def cycle(self):
+        self.mode = MODES[(MODES.index(self.mode) + 1) % len(MODES)]
+
+    def resolve(self, count):
+        if self.mode == 'auto':
+            return 'density' if count > self.density_above else 'dots'
+        return self.mode
+
+    def draw(self, surf, groups):
+        self.last = self.resolve(sum(len(g[0]) for g in groups))
+        if self.last == 'density':
+            self.layer.draw(surf, groups)
+        else:
+            for pos, color, radius in groups:
+                splat(surf, pos, color, radius)
+        return self.last
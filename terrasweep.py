@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Parameter sweep driver for terrasim4.py stability studies.
+
+terrasim4 exists to find reproduction rules that keep the critter population
+from exploding or going extinct. This runs the full grid of parameter values,
+several seeded headless replicates per point, in parallel across all cores,
+and streams one summary row per run into a CSV results table:
+
+  time_to_extinction  first sim second with no critters left (blank if none)
+  pop_mean, pop_var   population statistics after --burn-in (zeros after extinction count)
+  pop_final, at_cap   final count and fraction of samples at --animal-cap
+  algae_eq            mean algae biomass over the last quarter of the run
+
+Ranges are either comma lists (300,500,1000) or inclusive start:stop:step.
+
+Run:
+  python terrasweep.py --herbivores 40:160:40 --animal-cap 300,500,1000 \
+      --algae-init 0.1:0.3:0.1 --repro-threshold 1.0:1.3:0.1 \
+      --replicates 8 --sim-seconds 1800 --out sweep.csv
+"""
+import argparse
+import csv
+import itertools
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+
+import terrasim4
+
+# swept terrasim4 attribute (CLI flag with '-' for '_') -> value type
+SWEEPABLE = {
+    'herbivores': int,
+    'animal_cap': int,
+    'algae_init': float,
+    'repro_threshold': float,
+    'repro_algae_min': float,
+    'mate_radius': float,
+    'child_energy': float,
+    'parent_keep': float,
+}
+
+def parse_range(text, typ):
+    """'a,b,c' -> [a, b, c]; 'start:stop:step' -> inclusive arithmetic range."""
+    if ':' in text:
+        parts = text.split(':')
+        if len(parts) != 3:
+            raise ValueError(f"range {text!r} is not start:stop:step")
+        start, stop, step = (float(x) for x in parts)
+        if step == 0:
+            raise ValueError(f"range {text!r} has a zero step")
+        n = int(np.floor((stop - start) / step + 1e-9)) + 1
+        return [typ(round(start + i * step, 10)) for i in range(max(n, 0))]
+    return [typ(x) for x in text.split(',')]
+
+def run_one(task):
+    """One seeded headless terrasim4 run; returns its summary row."""
+    params, seed, sim_seconds, sample_every, burn_in = task
+    args = terrasim4.make_parser().parse_args([])
+    for k, v in params.items():
+        setattr(args, k, v)
+    random.seed(seed)
+    sim = terrasim4.Simulation(args)
+    dt = args.tick_ms / 1000.0
+    every = max(1, int(round(sample_every / dt)))
+    ticks = int(round(sim_seconds / dt))
+    pops, algae = [], []
+    extinct_at = None
+    start = time.perf_counter()
+    # runs continue after extinction: the algae keep evolving, so algae_eq is
+    # taken over the same window for every row of the sweep
+    for tick in range(1, ticks + 1):
+        sim.update(dt)
+        if tick % every == 0:
+            pops.append(len(sim.critters))
+            algae.append(sim.algae.total_biomass())
+        if extinct_at is None and len(sim.critters) == 0:
+            extinct_at = tick * dt
+    t_sim = ticks * dt
+    times = (np.arange(len(pops)) + 1) * every * dt
+    p = np.asarray(pops, dtype=float)[times >= burn_in] if pops else np.zeros(0)
+    a = np.asarray(algae, dtype=float)
+    tail = a[len(a) * 3 // 4:] if len(a) else a
+    row = dict(params)
+    row.update({
+        'seed': seed,
+        'sim_seconds': round(t_sim, 3),
+        'time_to_extinction': '' if extinct_at is None else round(extinct_at, 3),
+        'pop_mean': round(float(p.mean()), 3) if len(p) else '',
+        'pop_var': round(float(p.var()), 3) if len(p) else '',
+        'pop_final': len(sim.critters),
+        'at_cap': round(float((p >= args.animal_cap).mean()), 4) if len(p) else '',
+        'algae_eq': round(float(tail.mean()), 5) if len(tail) else 0.0,
+        'wall_s': round(time.perf_counter() - start, 3),
+    })
+    return row
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel parameter sweep over terrasim4 (headless)")
+    for name, typ in SWEEPABLE.items():
+        parser.add_argument('--' + name.replace('_', '-'), default=None,
+                            help=f'{typ.__name__} values: list a,b,c or range start:stop:step')
+    parser.add_argument('--replicates', type=int, default=4, help='seeded runs per parameter point')
+    parser.add_argument('--seed', type=int, default=0, help='base seed; replicate r of point i uses seed+i*replicates+r')
+    parser.add_argument('--sim-seconds', type=float, default=1200.0)
+    parser.add_argument('--sample-every', type=float, default=1.0, help='sim seconds between population samples')
+    parser.add_argument('--burn-in', type=float, default=60.0, help='sim seconds excluded from pop mean/var')
+    parser.add_argument('--workers', type=int, default=0, help='worker processes (0 = all cores)')
+    parser.add_argument('--out', default='sweep.csv')
+    args = parser.parse_args(argv)
+    if args.burn_in >= args.sim_seconds:
+        parser.error(f"--burn-in ({args.burn_in:g}) must be shorter than --sim-seconds ({args.sim_seconds:g})")
+
+    axes = {}
+    for name, typ in SWEEPABLE.items():
+        if getattr(args, name) is not None:
+            try:
+                axes[name] = parse_range(getattr(args, name), typ)
+            except ValueError as e:
+                parser.error(f"--{name.replace('_', '-')}: {e}")
+    points = [dict(zip(axes, combo)) for combo in itertools.product(*axes.values())] or [{}]
+    tasks = [(pt, args.seed + i * args.replicates + r, args.sim_seconds, args.sample_every, args.burn_in)
+             for i, pt in enumerate(points) for r in range(args.replicates)]
+    workers = args.workers or os.cpu_count() or 1
+    print(f"{len(points)} points x {args.replicates} replicates = {len(tasks)} runs on {workers} workers",
+          file=sys.stderr)
+
+    start = time.perf_counter()
+    with open(args.out, 'w', newline='') as f, Pool(workers) as pool:
+        writer = None
+        for done, row in enumerate(pool.imap_unordered(run_one, tasks), start=1):
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=list(row))
+                writer.writeheader()
+            writer.writerow(row)
+            f.flush()
+            print(f"\r{done}/{len(tasks)} runs  {time.perf_counter() - start:.0f}s", end='', file=sys.stderr)
+    print(f"\nwrote {args.out}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Streaming columnar telemetry for long terrarium runs (terrasim.py, terrasim4.py).
+
+A telemetry store is a directory:
+  schema.json    column names and dtypes, rows per write group, run metadata
+  <column>.bin   raw little-endian values of one column, appended group by group
+
+The writer keeps one fixed-size buffer per column (`group_rows` values) and
+appends a whole row group to every column file when the buffers fill up, so
+memory stays bounded however long the run. Readers open each column with
+np.memmap, which means millions of samples can be sliced, reduced or plotted
+without loading them all. A run cut short loses at most its last partial
+group; the readable row count is the shortest column.
+
+The simulations write a store with --telemetry DIR (--telemetry-every s).
+
+Usage:
+  python terratelemetry.py info run.tlm
+  python terratelemetry.py plot run.tlm --cols o2,co2,algae --out run.png
+"""
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+VERSION = 1
+SCHEMA = 'schema.json'
+
+
+def _column_path(path, name):
+    return os.path.join(path, name + '.bin')
+
+
+class TelemetryWriter:
+    """Append rows (dicts of scalars) to a columnar store, one row group at a time."""
+    def __init__(self, path, columns, meta=None, group_rows=4096):
+        self.path = path
+        self.columns = {name: np.dtype(dt).newbyteorder('<') for name, dt in columns.items()}
+        self.group_rows = group_rows
+        schema = {'version': VERSION, 'group_rows': group_rows, 'meta': meta or {},
+                  'columns': [{'name': n, 'dtype': dt.str} for n, dt in self.columns.items()]}
+        os.makedirs(path, exist_ok=True)
+        old = os.path.join(path, SCHEMA)
+        if os.path.exists(old):
+            with open(old) as f:
+                prev = json.load(f)
+            if prev['columns'] != schema['columns']:
+                raise ValueError(f"{path}: existing telemetry has different columns; pick a new path")
+            schema['meta'] = {**prev.get('meta', {}), **schema['meta']}
+        with open(old, 'w') as f:
+            json.dump(schema, f, indent=1)
+        # resuming: trim every column to the common length so rows stay aligned
+        rows = min((os.path.getsize(_column_path(path, n)) // dt.itemsize
+                    if os.path.exists(_column_path(path, n)) else 0) for n, dt in self.columns.items())
+        self.files = {}
+        for n, dt in self.columns.items():
+            f = open(_column_path(path, n), 'ab')
+            f.truncate(rows * dt.itemsize)
+            self.files[n] = f
+        self.rows = rows
+        self._buf = {n: np.empty(group_rows, dtype=dt) for n, dt in self.columns.items()}
+        self._fill = 0
+
+    @classmethod
+    def for_row(cls, path, row, **kw):
+        """Writer whose columns (int64 or float64) follow the keys and types of `row`."""
+        cols = {k: np.int64 if isinstance(v, (int, np.integer)) and not isinstance(v, bool) else np.float64
+                for k, v in row.items()}
+        return cls(path, cols, **kw)
+
+    def append(self, row):
+        i = self._fill
+        for n, buf in self._buf.items():
+            buf[i] = row[n]
+        self._fill = i + 1
+        if self._fill == self.group_rows:
+            self.flush()
+
+    def flush(self):
+        if self._fill:
+            for n, f in self.files.items():
+                f.write(self._buf[n][:self._fill].tobytes())
+                f.flush()
+            self.rows += self._fill
+            self._fill = 0
+
+    def close(self):
+        self.flush()
+        for f in self.files.values():
+            f.close()
+
+
+class TelemetrySampler:
+    """Append one row of stats() to a store every `every` sim seconds.
+
+    The writer is created on the first sample, with columns 't' plus the keys
+    of that row. If the simulation clock goes backwards (reset, restored
+    snapshot) or the store already holds a later run, the time column carries
+    on from the last sample instead.
+    """
+    def __init__(self, path, every=1.0, meta=None, group_rows=4096):
+        self.path, self.every, self.meta, self.group_rows = path, every, meta, group_rows
+        self.writer = None
+        self.offset = 0.0
+        self._last = None   # sim time of the last offer
+        self._next = None
+
+    def offer(self, sim_time, stats):
+        """Called after every tick; `stats` is only evaluated when a sample is due."""
+        if self._last is not None and sim_time < self._last:
+            self.offset += self._last - sim_time
+            self._next -= self._last - sim_time
+        self._last = sim_time
+        if self._next is not None and sim_time + 1e-9 < self._next:
+            return
+        row = {'t': round(sim_time + self.offset, 6), **stats()}
+        if self.writer is None:
+            self.writer = TelemetryWriter.for_row(self.path, row, meta={'every': self.every, **(self.meta or {})},
+                                                  group_rows=self.group_rows)
+            if self.writer.rows:
+                last = float(Telemetry(self.path)['t'][-1])
+                if last >= row['t']:
+                    self.offset += last + self.every - row['t']
+                    row['t'] = round(sim_time + self.offset, 6)
+        self.writer.append(row)
+        self._next = sim_time + self.every
+
+    @property
+    def rows(self):
+        return self.writer.rows + self.writer._fill if self.writer is not None else 0
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+class Telemetry:
+    """Memory-mapped reader: tel['o2'] is an np.memmap over the whole column."""
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, SCHEMA)) as f:
+            self.schema = json.load(f)
+        if self.schema.get('version') != VERSION:
+            raise ValueError(f"{path}: telemetry version {self.schema.get('version')} (expected {VERSION})")
+        self.meta = self.schema.get('meta', {})
+        self.dtypes = {c['name']: np.dtype(c['dtype']) for c in self.schema['columns']}
+        self.rows = min(os.path.getsize(_column_path(path, n)) // dt.itemsize for n, dt in self.dtypes.items())
+        self._cols = {}
+
+    @property
+    def names(self):
+        return list(self.dtypes)
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, name):
+        col = self._cols.get(name)
+        if col is None:
+            if self.rows == 0:
+                col = np.empty(0, dtype=self.dtypes[name])
+            else:
+                col = np.memmap(_column_path(self.path, name), dtype=self.dtypes[name], mode='r', shape=(self.rows,))
+            self._cols[name] = col
+        return col
+
+    def envelope(self, name, buckets=1000, start=0, stop=None):
+        """Per-bucket (lo, hi) of rows start:stop, for plotting a long column at screen resolution."""
+        a = self[name][start:stop]
+        per = max(1, -(-len(a) // buckets))
+        k = len(a) // per
+        lo, hi = a[:k * per].reshape(k, per).min(axis=1), a[:k * per].reshape(k, per).max(axis=1)
+        if k * per < len(a):
+            lo = np.append(lo, a[k * per:].min()); hi = np.append(hi, a[k * per:].max())
+        return lo.astype(np.float64), hi.astype(np.float64)
+
+    def describe(self, name, chunk=1 << 20):
+        """min / mean / max of a column, streamed in chunks."""
+        a = self[name]
+        if not len(a):
+            return {'min': None, 'mean': None, 'max': None}
+        lo, hi, total = np.inf, -np.inf, 0.0
+        for i in range(0, len(a), chunk):
+            c = np.asarray(a[i:i + chunk], dtype=np.float64)
+            lo, hi, total = min(lo, c.min()), max(hi, c.max()), total + c.sum()
+        return {'min': float(lo), 'mean': float(total / len(a)), 'max': float(hi)}
+
+
+PLOT_COLORS = [(200, 220, 220), (120, 210, 140), (220, 120, 120), (130, 160, 230),
+               (230, 200, 110), (190, 130, 220), (110, 210, 210), (240, 150, 80)]
+
+def plot(tel, cols, out, size=(1200, 600), x='t'):
+    """Min/max envelope of each column (each scaled to its own range) into a PNG, via pygame."""
+    os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+    import pygame
+    pygame.font.init()
+    w, h = size
+    surf = pygame.Surface(size)
+    surf.fill((20, 20, 28))
+    font = pygame.font.Font(None, 20)
+    left, right, bottom = 10, w - 10, h - 24
+    pw = right - left
+    series, lx, ly = [], left, 8
+    for i, name in enumerate(cols):
+        color = PLOT_COLORS[i % len(PLOT_COLORS)]
+        lo, hi = tel.envelope(name, buckets=pw)
+        label = font.render(f"{name} [{float(lo.min()):.4g} .. {float(hi.max()):.4g}]", True, color)
+        if lx > left and lx + label.get_width() > right:
+            lx, ly = left, ly + 20
+        surf.blit(label, (lx, ly))
+        lx += label.get_width() + 24
+        series.append((color, lo, hi))
+    top = ly + 24
+    for color, lo, hi in series:
+        vmin, vmax = float(lo.min()), float(hi.max())
+        span = (vmax - vmin) or 1.0
+        y = lambda v: bottom - (bottom - top) * (v - vmin) / span
+        xs = left + np.arange(len(lo)) * pw / max(1, len(lo) - 1)
+        mids = [(float(px), float(y((a + b) / 2))) for px, a, b in zip(xs, lo, hi)]
+        for px, a, b in zip(xs.tolist(), lo.tolist(), hi.tolist()):
+            if a != b:
+                pygame.draw.line(surf, color, (px, y(a)), (px, y(b)))
+        if len(mids) > 1:
+            pygame.draw.lines(surf, color, False, mids, 2)
+    if x in tel.names and len(tel):
+        xs = tel[x]
+        surf.blit(font.render(f"{x} {xs[0]:.6g} .. {xs[-1]:.6g}  ({len(tel)} samples)", True, (200, 200, 200)),
+                  (left, h - 20))
+    pygame.image.save(surf, out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or plot a terrarium telemetry store")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p_info = sub.add_parser('info', help='schema, row count and per-column min/mean/max')
+    p_info.add_argument('path')
+    p_plot = sub.add_parser('plot', help='min/max envelope plot to PNG')
+    p_plot.add_argument('path')
+    p_plot.add_argument('--cols', default=None, help='comma-separated columns (default: all but t)')
+    p_plot.add_argument('--out', default='telemetry.png')
+    p_plot.add_argument('--width', type=int, default=1200)
+    p_plot.add_argument('--height', type=int, default=600)
+    args = parser.parse_args(argv)
+
+    tel = Telemetry(args.path)
+    if args.cmd == 'info':
+        print(json.dumps({'rows': len(tel), 'meta': tel.meta}))
+        for name in tel.names:
+            d = tel.describe(name)
+            fmt = lambda v: '-' if v is None else f"{v:.6g}"
+            print(f"{name:>14} {tel.dtypes[name].str:>4}  min {fmt(d['min']):>10}  mean {fmt(d['mean']):>10}  "
+                  f"max {fmt(d['max']):>10}")
+    else:
+        cols = args.cols.split(',') if args.cols else [n for n in tel.names if n != 't']
+        unknown = [c for c in cols if c not in tel.dtypes]
+        if unknown:
+            parser.error(f"unknown column(s) {', '.join(unknown)}; have {', '.join(tel.names)}")
+        if not len(tel):
+            parser.error(f"{args.path} has no complete rows yet")
+        plot(tel, cols, args.out, (args.width, args.height))
+        print(f"wrote {args.out}")
+
+if __name__ == '__main__':
+    sys.exit(main())
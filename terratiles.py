@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Domain-decomposed, multi-core terrasim4 for very large arenas (headless).
+
+The algae grid lives in shared memory as two float32 buffers (front/back).
+The arena is split into a grid of tiles, and each worker process owns one
+tile's cells and the critters standing on them. A tick goes like this:
+
+  spread     each worker copies its tile plus a one-cell halo out of the
+             front buffer (wrapping at the torus edges) and applies the
+             spread stencil into its part of the back buffer. A barrier
+             follows, then the buffers swap. This repeats per substep.
+  grow       logistic growth and reseeding on the worker's own cells; barrier
+  forage     probes may read neighbouring tiles; barrier
+  eat/step   writes only the worker's own cells; then cull and reproduce
+  report     partial sums plus the critters that left the tile go to the
+             coordinator over a pipe
+
+The coordinator reduces the partial sums into the shared Environment
+(O2, CO2, nutrients) with terrasim4's formulas and routes the migrants to
+their new owners. It then starts the next tick. The round trip doubles as
+the barrier between eating and the next halo read.
+
+Differences from terrasim4:
+  - algae also spread laterally (terrasim's stencil, --spread)
+  - mates are only paired within one tile
+  - the free room below --animal-cap is shared out in proportion to each
+    tile's population
+  - critter ids are unique per worker (tile index in the high bits)
+
+Run:
+  python terratiles.py --width 10000 --height 10000 --herbivores 50000 \
+      --animal-cap 200000 --workers 8 --sim-seconds 120 --out tiles.csv
+"""
+import argparse
+import csv
+import math
+import os
+import sys
+import time
+from multiprocessing import Barrier, Pipe, Process
+from multiprocessing.shared_memory import SharedMemory
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+
+import terrasim4
+from terrasim import make_spread_kernel
+from terrasim4 import Environment, Population, clamp, forage_directions
+
+ID_BITS = 40  # ids of worker k start at k << ID_BITS
+MIGRANT_FIELDS = ('ids', 'pos', 'vel', 'energy', 'age', 'max_age')
+
+
+def split(n, parts):
+    """Boundaries of `parts` near-equal ranges covering 0..n."""
+    return [n * i // parts for i in range(parts + 1)]
+
+def tile_layout(workers, rows, cols):
+    """Pick a (tile_rows, tile_cols) factorization of `workers` with tiles as square as possible."""
+    best = None
+    for tr in range(1, workers + 1):
+        if workers % tr:
+            continue
+        tc = workers // tr
+        aspect = abs(math.log((rows / tr) / (cols / tc)))
+        if best is None or aspect < best[0]:
+            best = (aspect, tr, tc)
+    return best[1], best[2]
+
+
+class TileAlgae:
+    """One worker's view of the shared algae grid: reads anywhere (torus-wrapped),
+    writes only to its own [r0:r1, c0:c1] block."""
+    def __init__(self, buffers, cell, bounds, kernel, spread, substeps, rng):
+        self.buffers = buffers          # [front, back] full-grid arrays over shared memory
+        self.rows, self.cols = buffers[0].shape
+        self.cell = cell
+        self.r0, self.r1, self.c0, self.c1 = bounds
+        self.kernel = kernel
+        self.spread = spread
+        self.substeps = max(1, substeps)
+        self.rng = rng
+        # wrapped row/col indices of the tile plus its one-cell halo
+        self._hr = np.arange(self.r0 - 1, self.r1 + 1) % self.rows
+        self._hc = np.arange(self.c0 - 1, self.c1 + 1) % self.cols
+        self._tmp = np.empty((self.r1 - self.r0, self.c1 - self.c0), dtype=np.float32)
+
+    @property
+    def grid(self):
+        return self.buffers[0]
+
+    @property
+    def tile(self):
+        return self.buffers[0][self.r0:self.r1, self.c0:self.c1]
+
+    def swap(self):
+        self.buffers.reverse()
+
+    def spread_step(self, dt):
+        """Stencil pass from the front tile (+halo) into the back tile; caller barriers and swaps."""
+        pad = self.grid[np.ix_(self._hr, self._hc)]
+        th, tw = self._tmp.shape
+        acc = self._tmp
+        acc.fill(0.0)
+        for dr, dc, wgt in self.kernel:
+            acc += wgt * pad[1 + dr:1 + dr + th, 1 + dc:1 + dc + tw]
+        k = self.spread * dt
+        dst = self.buffers[1][self.r0:self.r1, self.c0:self.c1]
+        np.multiply(pad[1:-1, 1:-1], 1.0 - k, out=dst)
+        acc *= k
+        dst += acc
+        np.clip(dst, 0.0, 1.0, out=dst)
+
+    def grow(self, env, dt):
+        """terrasim4's logistic growth + Bernoulli reseeding on the own block; returns its new sum."""
+        light = env.light(0)
+        x, tmp = self.tile, self._tmp
+        lim = min(1.0, 0.2 + 0.8*light) * min(1.0, 0.3 + 0.7*env.nutrients) * min(1.0, env.water)
+        np.subtract(1.0, x, out=tmp)
+        tmp *= 0.45 * lim * dt
+        tmp += 1.0 - 0.02 * (1.0 - light) * dt
+        x *= tmp
+        np.clip(x, 0.0, 1.0, out=x)
+        hits = self.rng.binomial(x.size, min(1.0, 0.0005 * dt))
+        if hits:
+            idx = np.unique(self.rng.integers(0, x.size, hits))
+            r, c = np.divmod(idx, x.shape[1])
+            x[r, c] = np.minimum(x[r, c] + 0.2, 1.0)
+        return float(x.sum(dtype=np.float64))
+
+    def sample_many(self, pts):
+        r = (pts[..., 1] // self.cell).astype(np.intp) % self.rows
+        c = (pts[..., 0] // self.cell).astype(np.intp) % self.cols
+        return self.grid[r, c]
+
+    def eat_many(self, pos, amount):
+        """Like AlgaeGrid.eat_many, for critters standing on this tile's cells."""
+        r = (pos[:, 1] // self.cell).astype(np.intp) % self.rows
+        c = (pos[:, 0] // self.cell).astype(np.intp) % self.cols
+        cells, inv, counts = np.unique(r * self.cols + c, return_inverse=True, return_counts=True)
+        flat = self.grid.reshape(-1)
+        demand = counts * amount
+        taken = np.minimum(flat[cells], demand)
+        flat[cells] -= taken
+        return amount * (taken / demand)[inv], float(taken.sum())
+
+
+class TileWorker:
+    """Simulates one tile; driven by the coordinator over `conn`."""
+    def __init__(self, index, args, shm_name, shape, bounds, layout, barrier, conn, spawn=0):
+        self.index = index
+        self.args = args
+        self.w, self.h = args.width, args.height
+        self.barrier, self.conn = barrier, conn
+        self.shm = SharedMemory(name=shm_name)
+        full = np.ndarray((2,) + shape, dtype=np.float32, buffer=self.shm.buf)
+        self.rng = np.random.default_rng([args.seed, index])
+        self.algae = TileAlgae([full[0], full[1]], args.cell, bounds,
+                               make_spread_kernel(args.spread_kernel, args.spread_aniso),
+                               args.spread, args.spread_substeps, self.rng)
+        self.row_bounds, self.col_bounds = layout
+        self.critters = Population(capacity=256, trail_cap=1)
+        self.critters.sense = args.sense
+        self.critters.repro_threshold = args.repro_threshold
+        self.critters.next_id = index << ID_BITS
+        self.spawn(spawn)
+
+    # same sort-by-cell pairing as the single-process sim, on this tile's critters
+    _mate_pairs = terrasim4.Simulation._mate_pairs
+
+    def owners(self, pos):
+        """Tile index owning each (N, 2) pixel position."""
+        a = self.algae
+        r = (pos[:, 1] // a.cell).astype(np.intp) % a.rows
+        c = (pos[:, 0] // a.cell).astype(np.intp) % a.cols
+        tr = np.searchsorted(self.row_bounds, r, side='right') - 1
+        tc = np.searchsorted(self.col_bounds, c, side='right') - 1
+        return tr * (len(self.col_bounds) - 1) + tc
+
+    def spawn(self, k):
+        a = self.algae
+        lo = (a.c0 * a.cell, a.r0 * a.cell)
+        hi = (a.c1 * a.cell, a.r1 * a.cell)
+        pos = self.rng.uniform(lo, hi, (k, 2))
+        self.critters.add(pos, self.rng.uniform(-1, 1, (k, 2)), np.full(k, 1.0), self.rng.uniform(200, 500, k))
+
+    def immigrate(self, m):
+        pop = self.critters
+        k = len(m['ids'])
+        pop._reserve(pop.n + k)
+        for name in MIGRANT_FIELDS:
+            getattr(pop, name)[pop.n:pop.n + k] = m[name]
+        pop.trail_n[pop.n:pop.n + k] = 0
+        pop._track(pop.n, pop.n + k)
+        pop.n += k
+
+    def emigrate(self):
+        """Remove critters now standing on other tiles; return {tile: field arrays}."""
+        pop = self.critters
+        n = pop.n
+        dest = self.owners(pop.pos[:n])
+        away = dest != self.index
+        if not away.any():
+            return {}
+        out = {}
+        for d in np.unique(dest[away]).tolist():
+            sel = dest == d
+            out[d] = {name: getattr(pop, name)[:n][sel].copy() for name in MIGRANT_FIELDS}
+        pop.remove(np.flatnonzero(away))
+        return out
+
+    def reproduce(self, n_global, algae_mean):
+        pop, args = self.critters, self.args
+        n = pop.n
+        room = int((args.animal_cap - n_global) * n / max(1, n_global))
+        if algae_mean <= args.repro_algae_min or room <= 0 or n < 2:
+            return 0
+        max_d = (self.w / n_global) * args.mate_radius
+        eligible = self.rng.permutation(np.flatnonzero(pop.energy[:n] >= pop.repro_threshold))
+        a, b = self._mate_pairs(eligible, max_d)
+        wh = np.array((self.w, self.h))
+        d = (pop.pos[b] - pop.pos[a] + wh / 2) % wh - wh / 2
+        ok = np.hypot(d[:, 0], d[:, 1]) < max_d
+        a, b, d = a[ok][:room], b[ok][:room], d[ok][:room]
+        if len(a):
+            k = len(a)
+            pop.energy[a] *= args.parent_keep; pop.energy[b] *= args.parent_keep
+            pop.add((pop.pos[a] + d / 2) % wh, self.rng.uniform(-1, 1, (k, 2)),
+                    np.full(k, args.child_energy), self.rng.uniform(200, 500, k))
+        return len(a)
+
+    def tick(self, env, dt, n_global, algae_mean, immigrants):
+        args, algae, pop = self.args, self.algae, self.critters
+        if immigrants:
+            self.immigrate(immigrants)
+        sub_dt = dt / algae.substeps
+        for _ in range(algae.substeps):
+            algae.spread_step(sub_dt)
+            self.barrier.wait()
+            algae.swap()
+        grown = algae.grow(env, dt)
+        self.barrier.wait()
+        n = pop.n
+        bias = forage_directions(algae, pop.pos[:n], pop.sense, args.forage_probes, self.rng) if n else None
+        self.barrier.wait()
+        eaten = 0.0
+        if n:
+            got, eaten = algae.eat_many(pop.pos[:n], 0.2 * dt)
+            pop.energy[:n] += 2.0 * got
+            pop.step(dt, self.w, self.h, bias, self.rng)
+        deaths = pop.cull()
+        births = self.reproduce(n_global, algae_mean)
+        emigrants = self.emigrate()
+        return {'grown': grown, 'eaten': eaten, 'n_fed': n, 'deaths': deaths, 'births': births,
+                'n': pop.n, 'emigrants': emigrants}
+
+    def run(self):
+        try:
+            while True:
+                msg = self.conn.recv()
+                if msg is None:
+                    break
+                self.conn.send(self.tick(*msg))
+        finally:
+            self.algae = None
+            self.shm.close()
+
+
+def _worker_main(*a):
+    TileWorker(*a).run()
+
+
+class TiledTerrarium:
+    """Coordinator: owns the shared grid and the Environment, runs the workers in lockstep."""
+    def __init__(self, args):
+        self.args = args
+        self.dt = args.tick_ms / 1000.0
+        cols, rows = args.width // args.cell, args.height // args.cell
+        shape = (rows, cols)
+        tr, tc = args.tiles or tile_layout(args.workers, rows, cols)
+        self.layout = (split(rows, tr), split(cols, tc))
+        self.n_tiles = tr * tc
+        self.shm = SharedMemory(create=True, size=2 * rows * cols * 4)
+        full = np.ndarray((2,) + shape, dtype=np.float32, buffer=self.shm.buf)
+        rng = np.random.default_rng(args.seed)
+        full[0] = np.clip(rng.normal(args.algae_init, 0.05, shape), 0.0, 1.0)
+        self.size = rows * cols
+        self.total = float(full[0].sum(dtype=np.float64))
+        del full
+        self.env = Environment()
+        self.n = args.herbivores
+        self.ticks = 0
+        self._inbox = [None] * self.n_tiles
+        rb, cb = self.layout
+        bounds = [(rb[i // tc], rb[i // tc + 1], cb[i % tc], cb[i % tc + 1]) for i in range(self.n_tiles)]
+        # initial critters, shared out by tile area
+        areas = [(r1 - r0) * (c1 - c0) for r0, r1, c0, c1 in bounds]
+        counts = np.diff(np.round(np.cumsum([0] + areas) / self.size * args.herbivores)).astype(int)
+        barrier = Barrier(self.n_tiles)
+        self.conns, self.procs = [], []
+        for i in range(self.n_tiles):
+            parent, child = Pipe()
+            p = Process(target=_worker_main, daemon=True,
+                        args=(i, args, self.shm.name, shape, bounds[i], self.layout, barrier, child, int(counts[i])))
+            p.start()
+            self.conns.append(parent); self.procs.append(p)
+
+    def step(self):
+        env, dt = self.env, self.dt
+        total_before = self.total
+        for i, conn in enumerate(self.conns):
+            conn.send((env, dt, self.n, self.total / self.size, self._inbox[i]))
+            self._inbox[i] = None
+        reports = [conn.recv() for conn in self.conns]
+        # reduce partial sums into the shared environment (terrasim4.Simulation.update formulas)
+        grown = sum(r['grown'] for r in reports)
+        light = env.light(0)
+        ps = 0.02 * light * grown / self.size * dt
+        env.o2 = clamp(env.o2 + ps - 0.01 * (1.0 - light) * dt, 0.0, 0.35)
+        env.co2 = clamp(env.co2 - 0.8 * ps + 0.005 * (1.0 - light) * dt, 0.0, 0.01)
+        net = (grown - total_before) / self.size
+        env.nutrients = clamp(env.nutrients - max(0.0, net)*0.05 - 0.001*dt, 0.0, 1.0)
+        fed = sum(r['n_fed'] for r in reports)
+        if fed:
+            env.o2 = clamp(env.o2 - 0.0001 * dt * fed, 0.0, 0.35)
+            env.co2 = clamp(env.co2 + 0.00008 * dt * fed, 0.0, 0.01)
+        env.nutrients = clamp(env.nutrients + 0.01 * sum(r['deaths'] for r in reports), 0.0, 1.0)
+        self.total = grown - sum(r['eaten'] for r in reports)
+        self.n = sum(r['n'] for r in reports)
+        for r in reports:
+            for dest, m in r['emigrants'].items():
+                self._inbox[dest] = m if self._inbox[dest] is None else \
+                    {k: np.concatenate((self._inbox[dest][k], m[k])) for k in MIGRANT_FIELDS}
+                self.n += len(m['ids'])
+        self.ticks += 1
+        return reports
+
+    def stats(self):
+        env = self.env
+        return {'o2': round(env.o2, 5), 'co2': round(env.co2, 6), 'nutrients': round(env.nutrients, 5),
+                'algae': round(self.total / self.size, 5), 'critters': self.n}
+
+    def close(self):
+        for conn in self.conns:
+            try:
+                conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        for p in self.procs:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        self.shm.close()
+        self.shm.unlink()
+
+
+def non_negative_int(text):
+    """argparse type for --workers, where 0 means all cores."""
+    value = int(text)
+    if value < 0:
+        raise argparse.ArgumentTypeError(f"must be >= 0, got {value}")
+    return value
+
+def tile_grid(text):
+    """argparse type for --tiles: 'RxC' with positive R and C -> (R, C)."""
+    parts = text.lower().split('x')
+    try:
+        rows, cols = (int(v) for v in parts)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected RxC such as 2x4, got {text!r}")
+    if rows < 1 or cols < 1:
+        raise argparse.ArgumentTypeError(f"tile rows and columns must be >= 1, got {text!r}")
+    return rows, cols
+
+def make_parser():
+    parser = terrasim4.make_parser()
+    parser.description = "Domain-decomposed multi-process terrasim4 (headless)"
+    parser.add_argument('--workers', type=non_negative_int, default=0, help='worker processes / tiles (0 = all cores)')
+    parser.add_argument('--tiles', type=tile_grid, default=None, help="tile grid as RxC (overrides the automatic layout)")
+    parser.add_argument('--spread', type=float, default=0.05, help='algae lateral spread rate per second')
+    parser.add_argument('--spread-kernel', choices=['vonneumann', 'moore', 'aniso'], default='vonneumann')
+    parser.add_argument('--spread-aniso', type=float, default=0.75)
+    parser.add_argument('--spread-substeps', type=int, default=1)
+    return parser
+
+def main(argv=None):
+    args = make_parser().parse_args(argv)
+    args.workers = args.workers or os.cpu_count() or 1
+    if args.tiles:
+        args.workers = math.prod(args.tiles)
+    if args.seed is None:
+        args.seed = int.from_bytes(os.urandom(4), 'little')
+    sim = TiledTerrarium(args)
+    (rb, cb), dt = sim.layout, sim.dt
+    print(f"{len(rb) - 1}x{len(cb) - 1} tiles over a {cb[-1]}x{rb[-1]} cell grid on {sim.n_tiles} workers",
+          file=sys.stderr)
+    ticks = int(round(args.sim_seconds / dt))
+    every = max(1, int(round(args.stats_every / dt)))
+    out = open(args.out, 'w', newline='') if args.out else None
+    writer = None
+    start = time.perf_counter()
+    try:
+        for tick in range(1, ticks + 1):
+            sim.step()
+            if out is not None and tick % every == 0:
+                row = {'t': round(tick * dt, 6), **sim.stats()}
+                if writer is None:
+                    writer = csv.DictWriter(out, fieldnames=list(row))
+                    writer.writeheader()
+                writer.writerow(row)
+    finally:
+        if out is not None:
+            out.close()
+        sim.close()
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    print(f"{ticks} ticks ({ticks * dt:.0f} sim-s) in {elapsed:.2f}s: {ticks / elapsed:.1f} ticks/s, "
+          f"{ticks * sim.size / elapsed / 1e6:.1f} M cell-updates/s, final critters {sim.n}")
+
+if __name__ == '__main__':
+    main()